@@ -1,7 +1,8 @@
 import os
 import json
 from typing import Dict, List, Optional
-import google.generativeai as genai
+
+from metrics import instrument_generator, record_parse_failure
 
 # Syllabus module definitions (textbook order for Shubham)
 SYLLABUS_MODULES = {
@@ -442,6 +443,12 @@ SYLLABUS_MODULES = {
 
 SYLLABUS_MODULE_SEQUENCE = list(SYLLABUS_MODULES.keys())
 
+def _genai():
+    """Import the Gemini SDK on first use; it takes most of a second to load."""
+    import google.generativeai as genai
+    return genai
+
+
 class GeminiFlashcardGenerator:
     def __init__(self, api_key: str = None):
         """Initialize the Gemini API client"""
@@ -450,8 +457,9 @@ class GeminiFlashcardGenerator:
             raise ValueError("GEMINI_API_KEY environment variable must be set")
         
         # Configure the API
-        genai.configure(api_key=self.api_key)
+        _genai().configure(api_key=self.api_key)
     
+    @instrument_generator('gemini')
     def generate_flashcards(self, module: str, topics = None, count: int = 5, difficulty: str = "medium") -> dict:
         """Generate flashcards for a specific module and topic(s)
         
@@ -515,7 +523,7 @@ CRITICAL REQUIREMENTS:
 Return the JSON object directly - no formatting, no code blocks."""
 
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
+            model = _genai().GenerativeModel('gemini-2.5-flash')
             response = model.generate_content(prompt)
             
             # Extract JSON from response
@@ -561,6 +569,7 @@ Return the JSON object directly - no formatting, no code blocks."""
             }
             
         except json.JSONDecodeError as e:
+            record_parse_failure('gemini')
             return {
                 'success': False,
                 'error': f'Invalid JSON response: {str(e)}'
@@ -24,10 +24,7 @@ if not hasattr(_std_metadata, 'packages_distributions'):
 
         _std_metadata.packages_distributions = _empty_packages_distributions  # type: ignore[attr-defined]
 
-import google.generativeai as genai
-
-# Configure Gemini API
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+from metrics import instrument_generator, record_parse_failure
 
 PAYAL_CLASS_LABELS = {
     "class_11": "Class 11",
@@ -229,12 +226,21 @@ NEET: Biology-heavy, NCERT-based, conceptual + application, moderate difficulty
 INVALID_ESCAPE_RE = re.compile(r'\\(?!["\\/bfnrtu])')
 
 
+def _genai():
+    """Import the Gemini SDK on first use; it takes most of a second to load."""
+    import google.generativeai as genai
+    return genai
+
+
 class PayalFlashcardGenerator:
     """Generate exam-focused MCQs for Payal's preparation"""
     
     def __init__(self):
+        genai = _genai()
+        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
         self.model = genai.GenerativeModel('gemini-2.5-flash')
     
+    @instrument_generator('payal')
     def generate_cards(
         self, 
         topic: str, 
@@ -319,7 +325,7 @@ Generate {num_cards} questions now:
         try:
             response = self.model.generate_content(
                 prompt,
-                generation_config=genai.GenerationConfig(
+                generation_config=_genai().GenerationConfig(
                     temperature=0.7,
                     top_p=0.9,
                     top_k=40,
@@ -347,6 +353,7 @@ Generate {num_cards} questions now:
             return validated_cards
             
         except json.JSONDecodeError as e:
+            record_parse_failure('payal')
             print(f"JSON Parse Error: {e}")
             print(f"Response: {raw_content[:500] if 'raw_content' in locals() else ''}")
             return []
@@ -1,13 +1,33 @@
 import os
-import json
+import secrets
+from collections import Counter
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Blueprint, Flask, current_app, render_template, request, jsonify, redirect, url_for, flash
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
-from sqlalchemy import func
+from sqlalchemy import func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import undefer_group
 
 from config import Config
-from models import db, User, Deck, Card, CardProgress, Review, StudySession
+from models import db, User, Deck, Card, CardProgress, CardNeighbors, Review, StudySession, DISPLAY_ORDER_GAP, stats_from_counts
+from deck_provisioning import provision_deck_tree
+from deck_deletion import delete_cards, schedule_deck_deletion, purge_deleted_decks
+from deck_cloning import clone_deck_tree
+from etags import static_etag, user_data_etag
+import fast_json
+import syllabus_catalog
+from user_cache import user_cache
+from compression import init_compression
+from database_tuning import engine_options, init_database_tuning
+from query_stats import init_query_stats
+from slow_query_log import init_slow_query_log
+from static_assets import init_static_assets
+from metrics import init_metrics
+from request_profiler import init_request_profiler
+from card_renderer import render_card
+from card_search import ensure_search_index, rebuild_search_index, search_cards
+from related_cards import available as related_cards_available, build_all_neighbors, schedule_related_rebuild
 
 from ai_generator import (
     GeminiFlashcardGenerator,
@@ -34,7 +54,32 @@ def get_next_display_order(user_id, parent_id=None):
     else:
         query = query.filter(Deck.parent_id == parent_id)
     max_value = query.scalar()
-    return (max_value or 0) + 1
+    return (max_value or 0) + DISPLAY_ORDER_GAP
+
+
+def _sibling_sort_key(deck):
+    """Sort key matching the order decks are displayed in on the home page."""
+    order = deck.display_order if deck.display_order is not None else 10**6
+    return (order, deck.name.lower())
+
+
+def renumber_sibling_decks(user_id, parent_id, moved_deck=None, target=None, position='after'):
+    """Rewrite display_order for all siblings with DISPLAY_ORDER_GAP spacing.
+
+    Only needed when the gap between two neighbours is exhausted (or legacy rows
+    share the same order). If moved_deck/target are given, the moved deck is placed
+    before/after the target while renumbering.
+    """
+    siblings = Deck.query.filter_by(user_id=user_id, parent_id=parent_id).all()
+    siblings.sort(key=_sibling_sort_key)
+
+    if moved_deck is not None:
+        siblings = [d for d in siblings if d.id != moved_deck.id]
+        target_idx = next((i for i, d in enumerate(siblings) if d.id == target.id), len(siblings) - 1)
+        siblings.insert(target_idx if position == 'before' else target_idx + 1, moved_deck)
+
+    for i, sibling in enumerate(siblings, start=1):
+        sibling.display_order = i * DISPLAY_ORDER_GAP
 
 
 def _normalize_question(text: str) -> str:
@@ -49,46 +94,25 @@ def ensure_ai_deck_hierarchy(user):
     if not user or not getattr(user, 'id', None):
         return 0
 
-    user_decks = Deck.query.filter_by(user_id=user.id).all()
-    deck_lookup = {(deck.parent_id, deck.name.strip().lower()): deck for deck in user_decks}
-
-    created = 0
-
-    def ensure_deck(name, parent=None):
-        nonlocal created
-        normalized_name = name.strip()
-        key = (parent.id if parent else None, normalized_name.lower())
-
-        existing = deck_lookup.get(key)
-        if existing:
-            return existing
-
-        deck = Deck(
-            user_id=user.id,
-            name=normalized_name,
-            parent_id=parent.id if parent else None,
-            display_order=get_next_display_order(user.id, parent.id if parent else None)
-        )
-        db.session.add(deck)
-        db.session.flush()
-        deck_lookup[key] = deck
-        created += 1
-        return deck
+    tree = []
 
     # Shubham modules and topics
     for module_name, module_info in SYLLABUS_MODULES.items():
-        parent_deck = ensure_deck(module_name)
-        for topic in module_info.get('topics', []) or []:
-            ensure_deck(topic, parent_deck)
+        tree.append({
+            'name': module_name,
+            'children': [{'name': topic} for topic in module_info.get('topics', []) or []]
+        })
 
     # Payal subjects by class and topics
     for subject, class_map in PAYAL_SUBJECTS.items():
         for class_key, topics in class_map.items():
             class_label = class_key.replace('_', ' ').title()
-            parent_name = f"{class_label} - {subject}"
-            parent_deck = ensure_deck(parent_name)
-            for topic in topics:
-                ensure_deck(topic, parent_deck)
+            tree.append({
+                'name': f"{class_label} - {subject}",
+                'children': [{'name': topic} for topic in topics]
+            })
+
+    created = provision_deck_tree(user.id, tree, enforce_order=False)['created']
 
     if created:
         db.session.commit()
@@ -96,52 +120,152 @@ def ensure_ai_deck_hierarchy(user):
     return created
 
 
-app = Flask(__name__)
-app.config.from_object(Config)
+def build_payal_deck_tree():
+    """Desired deck tree for Payal: 'Class X - Subject' parents with topic subdecks."""
+    tree = []
+    for class_key in PAYAL_CLASS_ORDER:
+        class_label = PAYAL_CLASS_LABELS.get(class_key, class_key.replace('_', ' ').title())
+        for subject in PAYAL_SUBJECT_ORDER:
+            topics = PAYAL_SUBJECTS.get(subject, {}).get(class_key)
+            if not topics:
+                continue
+            tree.append({
+                'name': f"{class_label} - {subject}",
+                'description': f"{subject} syllabus for {class_label}",
+                'legacy_names': [f"{subject} - {class_label}"],
+                'children': [{'name': topic, 'description': f"Topic: {topic}"} for topic in topics]
+            })
+    return tree
+
+
+def build_shubham_deck_tree():
+    """Desired deck tree for Shubham: syllabus modules with topic subdecks."""
+    tree = []
+    for module_name in SYLLABUS_MODULE_SEQUENCE:
+        module_info = SYLLABUS_MODULES[module_name]
+        tree.append({
+            'name': module_name,
+            'description': module_info.get('description', f'{module_name} topics'),
+            'children': [
+                {'name': topic, 'description': f"Topic: {topic}"}
+                for topic in module_info.get('topics', [])
+            ]
+        })
+    return tree
+
 
-# Initialize database
-db.init_app(app)
+# All pages, API routes, template filters and CLI commands; create_app() registers them
+bp = Blueprint('main', __name__, cli_group=None)
 
-# Initialize Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
 login_manager.login_message = 'Please log in to access this page.'
 
-# Ensure instance folder exists
-os.makedirs('instance', exist_ok=True)
+
+def create_app(config_object=Config):
+    """Application factory.
+
+    Everything that touches the database happens here, once per process, and
+    the engine's pool is emptied afterwards: under `gunicorn --preload` (see
+    gunicorn.conf.py) this runs in the master, and a connection opened here
+    must not be inherited by the forked workers.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    app.json = fast_json.FastJSONProvider(app)
+    os.makedirs(app.instance_path, exist_ok=True)
+
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS override the ones derived from the DB_* settings
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config), **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    db.init_app(app)
+    init_database_tuning(app)
+    login_manager.init_app(app)
+    user_cache.configure(maxsize=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL'])
+
+    # Compression first so it runs last, on the final body; the profiler next so
+    # its profile covers the remaining request hooks
+    init_compression(app)
+    init_request_profiler(app)
+    init_query_stats(app)
+    init_metrics(app)
+    init_slow_query_log(app)
+    app.register_blueprint(bp)
+    init_static_assets(app)
+
+    if app.config['INIT_DATABASE_ON_STARTUP']:
+        with app.app_context():
+            init_database(app)
+            resume_deck_purges(app)
+            db.engine.dispose()
+    return app
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
-
-
-@app.before_request
-def create_tables():
-    """Create database tables before first request"""
+    user_id = int(user_id)
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    user = db.session.get(User, user_id)
+    return user_cache.put(user) if user else None
+
+
+# (table, column, column DDL) added by create_tables() on databases that predate them
+LIGHTWEIGHT_COLUMNS = [
+    ('users', 'data_version', 'INTEGER NOT NULL DEFAULT 0'),
+    ('decks', 'parent_id', 'INTEGER REFERENCES decks(id)'),
+    ('decks', 'deleted_at', 'TIMESTAMP'),
+    ('decks', 'cloned_from_id', 'INTEGER'),
+    ('cards', 'cloned_from_id', 'INTEGER'),
+    ('cards', 'rendered_html', 'JSON'),
+    ('study_sessions', 'card_queue', 'JSON'),
+]
+
+
+def init_database(app):
+    """Create database tables and add missing columns (run once by create_app)"""
     db.create_all()
 
-    # Lightweight migration: ensure parent_id column exists on decks table for hierarchical decks
+    # Lightweight migration: add columns introduced after a table was first created.
     # This avoids requiring Alembic for simple schema additions in development.
     from sqlalchemy import inspect, text
     inspector = inspect(db.engine)
-    cols = [c['name'] for c in inspector.get_columns('decks')]
-    if 'parent_id' not in cols:
+    existing_cols = {}
+    for table, column, ddl in LIGHTWEIGHT_COLUMNS:
+        if table not in existing_cols:
+            existing_cols[table] = {c['name'] for c in inspector.get_columns(table)}
+        if column in existing_cols[table]:
+            continue
         try:
-            # Add parent_id column referencing decks.id
-            db.session.execute(text('ALTER TABLE decks ADD COLUMN parent_id INTEGER REFERENCES decks(id)'))
+            db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
             db.session.commit()
-            app.logger.info('Added parent_id column to decks table')
+            app.logger.info(f'Added {column} column to {table} table')
         except Exception as e:
-            app.logger.warning(f'Could not add parent_id column automatically: {e}')
+            db.session.rollback()
+            app.logger.warning(f'Could not add {column} column automatically: {e}')
 
+    ensure_search_index(app.logger)
 
-@app.route('/login', methods=['GET', 'POST'])
+
+def resume_deck_purges(app):
+    """Finish background deck deletions that a worker restart or redeploy cut short."""
+    try:
+        purged = purge_deleted_decks(app.config['DECK_DELETE_CHUNK_SIZE'])
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f'Could not resume deck deletions: {e}')
+        return
+    if purged:
+        app.logger.info(f'Purged {purged} deck tree(s) left hidden by an interrupted deletion')
+
+
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     """User login"""
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     if request.method == 'POST':
         username = request.form.get('username')
@@ -152,18 +276,18 @@ def login():
         if user and user.check_password(password):
             login_user(user)
             next_page = request.args.get('next')
-            return redirect(next_page or url_for('index'))
+            return redirect(next_page or url_for('main.index'))
         else:
             flash('Invalid username or password', 'error')
     
     return render_template('login.html')
 
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     """User registration"""
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     if request.method == 'POST':
         username = request.form.get('username')
@@ -188,25 +312,27 @@ def register():
             db.session.commit()
             
             flash('Registration successful! Please log in.', 'success')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
     
     return render_template('register.html')
 
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     """User logout"""
+    user_cache.invalidate(current_user.id)
     logout_user()
     flash('You have been logged out.', 'success')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
 
-@app.route('/')
+@bp.route('/')
 @login_required
+@user_data_etag()
 def index():
     """Home page showing all decks"""
-    decks = Deck.query.filter_by(user_id=current_user.id).all()
+    decks = Deck.query.filter_by(user_id=current_user.id, deleted_at=None).all()
 
     # Build parent->children mapping for hierarchical display
     deck_map = {d.id: d for d in decks}
@@ -225,27 +351,35 @@ def index():
 
         return sorted(decks, key=deck_order_key)
 
+    # Card counts for every deck in one query, rolled up the tree below
+    own_counts = Deck.card_counts_by_deck(current_user.id)
+    subtree_counts = {}
+
     def build_node(deck):
+        children = [build_node(child) for child in sort_decks(children_map.get(deck.id, []))]
+
         # Aggregate stats across subdecks
-        stats = deck.get_stats(include_subdecks=True)
+        counts = Counter(own_counts.get(deck.id, {}))
+        for child in children:
+            counts.update(subtree_counts[child['deck'].id])
+        subtree_counts[deck.id] = counts
+        stats = stats_from_counts(counts)
         # Due count is the not_studied count from stats (includes all subdecks)
         due_count = stats.get('not_studied', 0)
 
-        node = {'deck': deck, 'stats': stats, 'due': due_count, 'children': []}
-        for child in sort_decks(children_map.get(deck.id, [])):
-            node['children'].append(build_node(child))
-        return node
+        return {'deck': deck, 'stats': stats, 'due': due_count, 'children': children}
 
     deck_tree = [build_node(d) for d in sort_decks(roots)]
 
     return render_template('index.html', deck_stats=deck_tree)
 
 
-@app.route('/deck/<int:deck_id>')
+@bp.route('/deck/<int:deck_id>')
 @login_required
+@user_data_etag(time_bucket=3600)
 def deck_detail(deck_id):
     """Deck detail page"""
-    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id).first_or_404()
+    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id, deleted_at=None).first_or_404()
     stats = deck.get_stats()
     
     # Get not-studied cards count
@@ -256,11 +390,11 @@ def deck_detail(deck_id):
     return render_template('deck_detail.html', deck=deck, stats=stats, due_count=not_studied_count)
 
 
-@app.route('/study/<int:deck_id>')
+@bp.route('/study/<int:deck_id>')
 @login_required
 def study(deck_id):
     """Study session page - show mode selection or start studying"""
-    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id).first_or_404()
+    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id, deleted_at=None).first_or_404()
     
     # Get study mode from query parameter
     mode = request.args.get('mode', 'select')
@@ -268,21 +402,10 @@ def study(deck_id):
     if mode == 'select':
         # Show mode selection page
         # Count cards for each mode
-        all_cards = Card.query.filter_by(deck_id=deck_id).count()
-        
-        trippy_cards = db.session.query(Card).join(
-            CardProgress, Card.id == CardProgress.card_id
-        ).filter(
-            Card.deck_id == deck_id,
-            CardProgress.last_result == 'trippy'
-        ).count()
-        
-        missed_cards = db.session.query(Card).join(
-            CardProgress, Card.id == CardProgress.card_id
-        ).filter(
-            Card.deck_id == deck_id,
-            CardProgress.last_result == 'incorrect'
-        ).count()
+        stats = deck.get_stats(include_subdecks=False)
+        all_cards = stats['total']
+        trippy_cards = stats['trippy']
+        missed_cards = stats['incorrect']
         
         return render_template('study_mode_select.html', 
                              deck=deck, 
@@ -290,8 +413,8 @@ def study(deck_id):
                              trippy_cards=trippy_cards,
                              missed_cards=missed_cards)
     
-    # Get cards based on mode
-    query = Card.query.filter_by(deck_id=deck_id)
+    # Build the queue from card ids only; card content is loaded a page at a time
+    query = db.session.query(Card.id).filter(Card.deck_id == deck_id)
     
     if mode == 'trippy':
         # Only cards marked as trippy
@@ -306,36 +429,139 @@ def study(deck_id):
     # else mode == 'all' - get all cards
     
     # Shuffle and limit
-    from sqlalchemy import func
-    cards = query.order_by(func.random()).limit(app.config['CARDS_PER_SESSION']).all()
+    card_ids = [row[0] for row in query.order_by(func.random()).limit(current_app.config['CARDS_PER_SESSION'])]
     
-    if not cards:
+    if not card_ids:
         flash(f'No cards available for {mode} mode!', 'info')
-        return redirect(url_for('deck_detail', deck_id=deck_id))
+        return redirect(url_for('main.deck_detail', deck_id=deck_id))
     
-    # Initialize progress for cards without it
-    for card in cards:
-        if not card.progress:
-            progress = CardProgress(card_id=card.id)
-            db.session.add(progress)
-    
-    db.session.commit()
-    
-    # Get or create study session
+    # Get or create study session (locked: concurrent page loads append queues to it)
     session = StudySession.query.filter_by(
         deck_id=deck_id, 
         ended_at=None
-    ).first()
+    ).with_for_update().first()
     
     if not session:
         session = StudySession(deck_id=deck_id)
         db.session.add(session)
-        db.session.commit()
     
-    return render_template('study.html', deck=deck, cards=cards, session_id=session.id, mode=mode)
+    # The open session is shared by every tab on this deck, so each page load
+    # gets its own queue, found by token; the oldest are dropped past the cap
+    queue_token = secrets.token_hex(8)
+    queues = list((session.card_queue or {}).get('queues', []))
+    queues.append({'token': queue_token, 'mode': mode, 'card_ids': card_ids})
+    session.card_queue = {'queues': queues[-current_app.config['STUDY_QUEUES_PER_SESSION']:]}
+    cards, next_cursor = load_study_page(card_ids, 0)
+    db.session.commit()
+    
+    return render_template('study.html', deck=deck, cards=cards, session_id=session.id, mode=mode,
+                           total_cards=len(card_ids), next_cursor=next_cursor, queue_token=queue_token)
+
+
+# INSERT constructs supporting ON CONFLICT DO NOTHING, by dialect name
+UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def load_study_page(card_ids, cursor):
+    """Load one page of a study queue, creating progress rows for its cards.
+
+    Returns (cards in queue order, next cursor or None when the queue is exhausted).
+    """
+    page_size = current_app.config['STUDY_PAGE_SIZE']
+    page_ids = card_ids[cursor:cursor + page_size]
+    if not page_ids:
+        return [], None
+
+    # Initialize progress for cards without it
+    with_progress = {
+        row[0] for row in db.session.query(CardProgress.card_id).filter(CardProgress.card_id.in_(page_ids))
+    }
+    missing = [card_id for card_id in page_ids if card_id not in with_progress]
+    if missing:
+        # Two requests for the same page (a double prefetch) can both see the rows missing
+        upsert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+        statement = upsert(CardProgress).on_conflict_do_nothing(index_elements=['card_id']) if upsert else insert(CardProgress)
+        db.session.execute(statement, [{'card_id': card_id} for card_id in missing])
+
+    by_id = {
+        card.id: card
+        for card in Card.query.options(undefer_group('content')).filter(Card.id.in_(page_ids))
+    }
+    cards = [by_id[card_id] for card_id in page_ids if card_id in by_id]
+
+    next_cursor = cursor + page_size
+    return cards, (next_cursor if next_cursor < len(card_ids) else None)
+
+
+@bp.route('/api/session/<int:session_id>/cards', methods=['GET'])
+@login_required
+def study_session_cards(session_id):
+    """Return the next page of a study session's queue as rendered card HTML"""
+    session = StudySession.query.join(Deck, StudySession.deck_id == Deck.id).filter(
+        StudySession.id == session_id,
+        Deck.user_id == current_user.id
+    ).first_or_404()
+    
+    token = request.args.get('queue')
+    queue = next((q for q in (session.card_queue or {}).get('queues', []) if q['token'] == token), None)
+    if session.ended_at is not None or queue is None:
+        return jsonify({
+            'success': False,
+            'expired': True,
+            'error': 'This study session has ended or expired. Reload the page to continue.'
+        }), 409
+    card_ids = queue['card_ids']
+    cursor = request.args.get('cursor', 0, type=int)
+    if cursor < 0:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    cards, next_cursor = load_study_page(card_ids, cursor)
+    db.session.commit()
+    
+    html = ''.join(
+        render_template('_study_card.html', card=card, index=cursor + i + 1, mode=queue['mode'])
+        for i, card in enumerate(cards)
+    )
+    return jsonify({
+        'success': True,
+        'html': html,
+        'count': len(cards),
+        'next_cursor': next_cursor,
+        'total': len(card_ids)
+    })
+
+
+@bp.route('/api/search', methods=['GET'])
+@login_required
+def search():
+    """Full-text search over the current user's cards, ranked and paginated"""
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', current_app.config['SEARCH_PAGE_SIZE'], type=int)
+    if not query:
+        return jsonify({'error': 'Missing search query'}), 400
+    if page < 1 or per_page < 1:
+        return jsonify({'error': 'Invalid page'}), 400
+    per_page = min(per_page, current_app.config['SEARCH_MAX_PAGE_SIZE'])
+    
+    try:
+        results, has_more = search_cards(current_user.id, query, page, per_page)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Search failed for {query!r}: {e}')
+        return jsonify({'error': 'Search is unavailable'}), 503
+    
+    return jsonify({
+        'success': True,
+        'query': query,
+        'results': results,
+        'page': page,
+        'per_page': per_page,
+        'has_more': has_more
+    })
 
 
-@app.route('/api/review', methods=['POST'])
+@bp.route('/api/review', methods=['POST'])
 @login_required
 def review_card():
     """Record a card review"""
@@ -356,7 +582,8 @@ def review_card():
     # Get or create progress
     progress = card.progress
     if not progress:
-        progress = CardProgress(card_id=card.id)
+        # Column defaults only apply at flush, so start the counters explicitly
+        progress = CardProgress(card_id=card.id, correct_count=0, incorrect_count=0, trippy_count=0)
         db.session.add(progress)
     
     # Update progress counts
@@ -400,7 +627,7 @@ def review_card():
     })
 
 
-@app.route('/api/card/<int:card_id>/clear_status', methods=['POST'])
+@bp.route('/api/card/<int:card_id>/clear_status', methods=['POST'])
 @login_required
 def clear_card_status(card_id):
     """Clear incorrect/trippy status - mark as mastered"""
@@ -425,7 +652,7 @@ def clear_card_status(card_id):
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/card/<int:card_id>/delete', methods=['DELETE'])
+@bp.route('/api/card/<int:card_id>/delete', methods=['DELETE'])
 @login_required
 def delete_card(card_id):
     """Delete a card"""
@@ -436,7 +663,7 @@ def delete_card(card_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        db.session.delete(card)
+        delete_cards([card.id])
         db.session.commit()
         return jsonify({'success': True})
     except Exception as e:
@@ -444,7 +671,164 @@ def delete_card(card_id):
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/card/<int:card_id>/progress', methods=['GET', 'PUT'])
+BULK_CARD_ACTIONS = ['delete', 'move', 'reset_progress', 'clear_status', 'set_difficulty']
+
+
+def _owned_card_ids_query(data):
+    """Build a query of card ids owned by the current user from a bulk request.
+
+    Accepts either 'card_ids' (list) or 'filter' ({deck_id, include_subdecks, status, difficulty}).
+    Ownership is enforced with a single join on decks.
+    """
+    query = db.session.query(Card.id).join(Deck, Card.deck_id == Deck.id).filter(
+        Deck.user_id == current_user.id,
+        Deck.deleted_at.is_(None)
+    )
+
+    card_ids = data.get('card_ids')
+    if card_ids is not None:
+        if not isinstance(card_ids, list) or not all(type(i) is int for i in card_ids):
+            raise ValueError('card_ids must be a list of integers')
+        return query.filter(Card.id.in_(card_ids))
+
+    filters = data.get('filter')
+    if not isinstance(filters, dict) or not filters.get('deck_id'):
+        raise ValueError('Provide card_ids or a filter with deck_id')
+
+    deck = Deck.query.filter_by(id=filters['deck_id'], user_id=current_user.id, deleted_at=None).first()
+    if not deck:
+        raise ValueError('Invalid deck in filter')
+    deck_ids = deck._collect_descendant_ids() if filters.get('include_subdecks') else [deck.id]
+    query = query.filter(Card.deck_id.in_(deck_ids))
+
+    status = filters.get('status')
+    if status == 'not_studied':
+        query = query.outerjoin(CardProgress, Card.id == CardProgress.card_id).filter(
+            (CardProgress.id == None) | (CardProgress.last_result == None)
+        )
+    elif status in ['correct', 'incorrect', 'trippy']:
+        query = query.join(CardProgress, Card.id == CardProgress.card_id).filter(
+            CardProgress.last_result == status
+        )
+    elif status is not None:
+        raise ValueError('Invalid status filter')
+
+    if filters.get('difficulty'):
+        query = query.filter(Card.difficulty == filters['difficulty'])
+    return query
+
+
+@bp.route('/api/cards/bulk', methods=['POST'])
+@login_required
+def bulk_card_action():
+    """Apply delete/move/reset_progress/clear_status/set_difficulty to many cards at once"""
+    data = request.json or {}
+    action = data.get('action')
+
+    if action not in BULK_CARD_ACTIONS:
+        return jsonify({'error': f'Invalid action. Expected one of: {", ".join(BULK_CARD_ACTIONS)}'}), 400
+
+    try:
+        owned_query = _owned_card_ids_query(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    requested = data.get('card_ids')
+    if requested is not None and owned_query.count() != len(set(requested)):
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    # The selection stays in the database: statements filter on it as a subquery
+    owned_ids = owned_query.statement.correlate(None)
+
+    def bulk_update(model, criterion, values):
+        return db.session.query(model).filter(criterion).update(values, synchronize_session=False)
+
+    rebuild_deck_ids = []
+    try:
+        if action == 'delete':
+            # Chunks of ids: delete_cards removes progress before cards, which
+            # would change what a status filter selects mid-way
+            affected = 0
+            while True:
+                chunk = db.session.scalars(owned_ids.limit(current_app.config['DECK_DELETE_CHUNK_SIZE'])).all()
+                if not chunk:
+                    break
+                delete_cards(chunk)
+                affected += len(chunk)
+        elif action == 'move':
+            target = Deck.query.filter_by(id=data.get('target_deck_id'), user_id=current_user.id, deleted_at=None).first()
+            if not target:
+                return jsonify({'error': 'Invalid target deck'}), 400
+            # Both the trees the cards leave and the one they join need new related cards
+            rebuild_deck_ids = [target.id, *(
+                deck_id for deck_id, in db.session.query(Card.deck_id).filter(Card.id.in_(owned_ids)).distinct()
+            )]
+            affected = bulk_update(Card, Card.id.in_(owned_ids), {Card.deck_id: target.id})
+        elif action == 'reset_progress':
+            # Cards without progress count as not studied; review history is kept
+            affected = db.session.query(CardProgress).filter(
+                CardProgress.card_id.in_(owned_ids)
+            ).delete(synchronize_session=False)
+        elif action == 'clear_status':
+            affected = bulk_update(CardProgress, CardProgress.card_id.in_(owned_ids) & CardProgress.last_result.in_(['incorrect', 'trippy']), {
+                CardProgress.last_result: 'correct',
+                CardProgress.last_reviewed: datetime.utcnow()
+            })
+        else:  # set_difficulty
+            difficulty = data.get('difficulty')
+            if difficulty not in ['easy', 'medium', 'hard', None]:
+                return jsonify({'error': 'Invalid difficulty'}), 400
+            affected = bulk_update(Card, Card.id.in_(owned_ids), {Card.difficulty: difficulty})
+
+        db.session.commit()
+        if affected and rebuild_deck_ids:
+            schedule_related_rebuild(*rebuild_deck_ids)
+        return jsonify({'success': True, 'action': action, 'affected': affected})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/card/<int:card_id>/related', methods=['GET'])
+@login_required
+def related_cards(card_id):
+    """Return precomputed similar cards from the same deck tree"""
+    owned = db.session.query(Card.id).join(Deck, Card.deck_id == Deck.id).filter(
+        Card.id == card_id,
+        Deck.user_id == current_user.id
+    ).first()
+    if not owned:
+        return jsonify({'error': 'Card not found'}), 404
+    
+    limit = min(request.args.get('limit', current_app.config['RELATED_CARDS_K'], type=int), current_app.config['RELATED_CARDS_K'])
+    entry = db.session.get(CardNeighbors, card_id)
+    neighbors = (entry.neighbors if entry else [])[:max(limit, 0)]
+    scores = dict(neighbors)
+    
+    related = []
+    if scores:
+        rows = db.session.query(
+            Card.id, Card.deck_id, Card.question, Deck.name, CardProgress.last_result
+        ).join(Deck, Card.deck_id == Deck.id).outerjoin(
+            CardProgress, CardProgress.card_id == Card.id
+        ).filter(
+            Card.id.in_(scores.keys()),
+            Deck.user_id == current_user.id,
+            Deck.deleted_at.is_(None)
+        ).all()
+        related = sorted([{
+            'card_id': row.id,
+            'deck_id': row.deck_id,
+            'deck_name': row.name,
+            'question': row.question,
+            'last_result': row.last_result,
+            'score': scores[row.id]
+        } for row in rows], key=lambda item: -item['score'])
+    
+    return jsonify({'success': True, 'card_id': card_id, 'related': related})
+
+
+@bp.route('/api/card/<int:card_id>/progress', methods=['GET', 'PUT'])
 @login_required
 def card_progress(card_id):
     """Get or update card progress"""
@@ -516,7 +900,7 @@ def card_progress(card_id):
 
 
 
-@app.route('/import', methods=['GET', 'POST'])
+@bp.route('/import', methods=['GET', 'POST'])
 @login_required
 def import_deck():
     """Import deck from JSON file"""
@@ -547,7 +931,7 @@ def import_deck():
         
         if file and file.filename.endswith('.json'):
             try:
-                data = json.load(file)
+                data = fast_json.loads(file.read())
                 
                 # Support two formats:
                 # 1. Full format: {"name": "...", "cards": [...]}
@@ -568,7 +952,7 @@ def import_deck():
                 
                 # Use existing deck or create new one
                 if existing_deck_id:
-                    deck = Deck.query.filter_by(id=existing_deck_id, user_id=current_user.id).first_or_404()
+                    deck = Deck.query.filter_by(id=existing_deck_id, user_id=current_user.id, deleted_at=None).first_or_404()
                     flash(f'Importing cards into existing deck: {deck.name}', 'info')
                 else:
                     # Create deck for current user with optional parent
@@ -738,6 +1122,7 @@ def import_deck():
                     db.session.add(card)
                 
                 db.session.commit()
+                schedule_related_rebuild(deck.id)
                 
                 # Count actual imported cards
                 imported_count = Card.query.filter_by(deck_id=deck.id).count()
@@ -748,7 +1133,7 @@ def import_deck():
                 else:
                     flash(f'Successfully imported deck: {deck.name} with {imported_count} cards', 'success')
                 
-                return redirect(url_for('deck_detail', deck_id=deck.id))
+                return redirect(url_for('main.deck_detail', deck_id=deck.id))
                 
             except Exception as e:
                 db.session.rollback()
@@ -769,7 +1154,7 @@ def import_deck():
                 path_parts.insert(0, current.name)
         return ' / '.join(path_parts)
     
-    user_decks = Deck.query.filter_by(user_id=current_user.id).order_by(Deck.name).all()
+    user_decks = Deck.query.filter_by(user_id=current_user.id, deleted_at=None).order_by(Deck.name).all()
     decks_with_paths = []
     for deck in user_decks:
         decks_with_paths.append({
@@ -780,13 +1165,14 @@ def import_deck():
     return render_template('import.html', decks=decks_with_paths)
 
 
-@app.route('/stats')
+@bp.route('/stats')
 @login_required
+@user_data_etag(time_bucket=300)
 def stats():
     """Statistics page"""
     # Overall statistics for current user
-    total_decks = Deck.query.filter_by(user_id=current_user.id).count()
-    total_cards = Card.query.join(Deck).filter(Deck.user_id == current_user.id).count()
+    total_decks = Deck.query.filter_by(user_id=current_user.id, deleted_at=None).count()
+    total_cards = Card.query.join(Deck).filter(Deck.user_id == current_user.id, Deck.deleted_at.is_(None)).count()
     
     # Get reviews only for cards belonging to current user's decks
     total_reviews = Review.query.join(Card).join(Deck).filter(
@@ -833,37 +1219,37 @@ def stats():
 
 
 
-@app.route('/deck/<int:deck_id>/delete', methods=['GET', 'POST'])
+@bp.route('/deck/<int:deck_id>/delete', methods=['GET', 'POST'])
 @login_required
 def delete_deck(deck_id):
     """Delete a deck"""
     # If GET request, show confirmation page
     if request.method == 'GET':
-        deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id).first_or_404()
+        deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id, deleted_at=None).first_or_404()
         return render_template('confirm_delete.html', deck=deck)
     
     # POST request - actually delete
-    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id).first_or_404()
+    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id, deleted_at=None).first_or_404()
     deck_name = deck.name
     
     try:
-        # Delete deck - cascade will handle subdecks, cards, and study sessions
-        db.session.delete(deck)
-        db.session.commit()
-        
-        flash(f'Deck "{deck_name}" deleted successfully', 'success')
+        # Set-based delete of subdecks, cards, progress and sessions; big trees go to the background
+        if schedule_deck_deletion(deck):
+            flash(f'Deck "{deck_name}" is being deleted in the background', 'success')
+        else:
+            flash(f'Deck "{deck_name}" deleted successfully', 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Error deleting deck: {str(e)}', 'error')
         
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
 
-@app.route('/api/deck/<int:deck_id>/rename', methods=['PUT'])
+@bp.route('/api/deck/<int:deck_id>/rename', methods=['PUT'])
 @login_required
 def rename_deck(deck_id):
     """Rename a deck"""
-    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id).first_or_404()
+    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id, deleted_at=None).first_or_404()
     
     data = request.json
     new_name = data.get('name', '').strip()
@@ -883,7 +1269,7 @@ def rename_deck(deck_id):
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/deck', methods=['POST'])
+@bp.route('/api/deck', methods=['POST'])
 @login_required
 def create_deck_api():
     """Create a new deck (optionally as a subdeck)."""
@@ -896,7 +1282,7 @@ def create_deck_api():
 
     # Validate parent belongs to user (if provided)
     if parent_id:
-        parent = Deck.query.filter_by(id=parent_id, user_id=current_user.id).first()
+        parent = Deck.query.filter_by(id=parent_id, user_id=current_user.id, deleted_at=None).first()
         if not parent:
             return jsonify({'error': 'Invalid parent deck'}), 400
 
@@ -917,11 +1303,46 @@ def create_deck_api():
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/deck/<int:deck_id>/move', methods=['PUT'])
+@bp.route('/api/deck/<int:deck_id>/clone', methods=['POST'])
+@login_required
+def clone_deck(deck_id):
+    """Copy a deck and all of its subdecks and cards (optionally without progress)."""
+    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id, deleted_at=None).first_or_404()
+    data = request.json or {}
+    name = (data.get('name') or f'{deck.name} (Copy)').strip()
+    parent_id = data.get('parent_id', deck.parent_id)
+    reset_progress = bool(data.get('reset_progress', False))
+
+    if len(name) > 200:
+        return jsonify({'error': 'Deck name too long (max 200 characters)'}), 400
+
+    if parent_id:
+        parent = Deck.query.filter_by(id=parent_id, user_id=current_user.id, deleted_at=None).first()
+        if not parent:
+            return jsonify({'error': 'Invalid parent deck'}), 400
+
+    try:
+        result = clone_deck_tree(
+            deck,
+            name=name,
+            parent_id=parent_id,
+            display_order=get_next_display_order(current_user.id, parent_id),
+            reset_progress=reset_progress
+        )
+        db.session.commit()
+        if result['cards_copied']:
+            schedule_related_rebuild(result['deck_id'])
+        return jsonify({'success': True, 'name': name, **result})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/deck/<int:deck_id>/move', methods=['PUT'])
 @login_required
 def move_deck(deck_id):
     """Change a deck's parent (move into a folder or make top-level)."""
-    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id).first_or_404()
+    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id, deleted_at=None).first_or_404()
     data = request.json or {}
     new_parent = data.get('parent_id')
 
@@ -929,11 +1350,11 @@ def move_deck(deck_id):
         return jsonify({'error': 'Cannot set deck as its own parent'}), 400
 
     if new_parent:
-        parent = Deck.query.filter_by(id=new_parent, user_id=current_user.id).first()
+        parent = Deck.query.filter_by(id=new_parent, user_id=current_user.id, deleted_at=None).first()
         if not parent:
             return jsonify({'error': 'Invalid parent deck'}), 400
         # Prevent cycles: ensure parent is not a descendant of deck
-        descendant_ids = deck._collect_descendant_ids()
+        descendant_ids = deck._collect_descendant_ids(include_deleted=True)
         if new_parent in descendant_ids:
             return jsonify({'error': 'Cannot move deck into its own descendant'}), 400
 
@@ -946,11 +1367,11 @@ def move_deck(deck_id):
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/deck/<int:deck_id>/reorder', methods=['PUT'])
+@bp.route('/api/deck/<int:deck_id>/reorder', methods=['PUT'])
 @login_required
 def reorder_deck(deck_id):
     """Change a deck's display order relative to a target deck."""
-    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id).first_or_404()
+    deck = Deck.query.filter_by(id=deck_id, user_id=current_user.id, deleted_at=None).first_or_404()
     data = request.json or {}
     target_id = data.get('target_id')
     position = data.get('position', 'after')  # 'before' or 'after'
@@ -958,35 +1379,39 @@ def reorder_deck(deck_id):
     if not target_id:
         return jsonify({'error': 'target_id required'}), 400
     
-    target = Deck.query.filter_by(id=target_id, user_id=current_user.id).first_or_404()
+    target = Deck.query.filter_by(id=target_id, user_id=current_user.id, deleted_at=None).first_or_404()
     
     # Must be at same level (same parent)
     if deck.parent_id != target.parent_id:
         return jsonify({'error': 'Can only reorder decks at the same level'}), 400
     
-    # Get all decks at this level
-    siblings = Deck.query.filter_by(
-        user_id=current_user.id,
-        parent_id=deck.parent_id
-    ).order_by(Deck.display_order, Deck.name).all()
-    
-    # Remove the dragged deck from list
-    siblings = [d for d in siblings if d.id != deck.id]
-    
-    # Find target position
-    target_idx = next((i for i, d in enumerate(siblings) if d.id == target_id), None)
-    if target_idx is None:
-        return jsonify({'error': 'Target deck not found'}), 400
-    
-    # Insert deck at new position
-    if position == 'before':
-        siblings.insert(target_idx, deck)
-    else:  # after
-        siblings.insert(target_idx + 1, deck)
-    
-    # Update display_order for all siblings
-    for i, sibling in enumerate(siblings):
-        sibling.display_order = i
+    if target.display_order is None:
+        renumber_sibling_decks(current_user.id, deck.parent_id, deck, target, position)
+    else:
+        # Nearest sibling on the far side of the target (excluding the dragged deck)
+        neighbour_query = db.session.query(Deck.display_order).filter(
+            Deck.user_id == current_user.id,
+            Deck.parent_id == deck.parent_id,
+            Deck.id.notin_([deck.id, target.id]),
+            Deck.display_order.isnot(None)
+        )
+        if position == 'before':
+            neighbour = neighbour_query.filter(Deck.display_order <= target.display_order).order_by(
+                Deck.display_order.desc()
+            ).limit(1).scalar()
+            bound = neighbour if neighbour is not None else target.display_order - 2 * DISPLAY_ORDER_GAP
+        else:  # after
+            neighbour = neighbour_query.filter(Deck.display_order >= target.display_order).order_by(
+                Deck.display_order.asc()
+            ).limit(1).scalar()
+            bound = neighbour if neighbour is not None else target.display_order + 2 * DISPLAY_ORDER_GAP
+
+        if abs(bound - target.display_order) > 1:
+            # Single-row update: place the deck halfway between target and neighbour
+            deck.display_order = (bound + target.display_order) // 2
+        else:
+            # Gap exhausted (or tied legacy orders) - renumber this level once
+            renumber_sibling_decks(current_user.id, deck.parent_id, deck, target, position)
     
     try:
         db.session.commit()
@@ -996,7 +1421,7 @@ def reorder_deck(deck_id):
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/session/<int:session_id>/end', methods=['POST'])
+@bp.route('/api/session/<int:session_id>/end', methods=['POST'])
 @login_required
 def end_session(session_id):
     """End a study session"""
@@ -1011,48 +1436,23 @@ def end_session(session_id):
     })
 
 
-@app.route('/api/ai/modules', methods=['GET'])
+@bp.route('/api/ai/modules', methods=['GET'])
 @login_required
+@static_etag(syllabus_catalog.ETAG, max_age=syllabus_catalog.CACHE_MAX_AGE)
 def get_ai_modules():
     """Get available modules and topics from AI generator"""
-    modules = []
-    for module_name, module_info in SYLLABUS_MODULES.items():
-        modules.append({
-            'name': module_name,
-            'hours': module_info['hours'],
-            'topics': module_info['topics']
-        })
-    
-    return jsonify({
-        'success': True,
-        'modules': modules
-    })
-
-
-def _build_payal_module_list():
-    """Return ordered list like 'Class 11 - Physics'."""
-    modules = []
-    for class_key in PAYAL_CLASS_ORDER:
-        class_label = PAYAL_CLASS_LABELS.get(class_key, class_key.replace('_', ' ').title())
-        for subject in PAYAL_SUBJECT_ORDER:
-            subject_topics = PAYAL_SUBJECTS.get(subject, {})
-            if class_key not in subject_topics:
-                continue
-            modules.append(f"{class_label} - {subject}")
-    return modules
+    return syllabus_catalog.json_response(syllabus_catalog.MODULES_JSON)
 
 
-@app.route('/api/ai/modules-payal', methods=['GET'])
+@bp.route('/api/ai/modules-payal', methods=['GET'])
 @login_required
+@static_etag(syllabus_catalog.ETAG, max_age=syllabus_catalog.CACHE_MAX_AGE)
 def get_ai_modules_payal():
     """Get ordered subjects for Payal's generator"""
-    return jsonify({
-        'success': True,
-        'modules': _build_payal_module_list()
-    })
+    return syllabus_catalog.json_response(syllabus_catalog.PAYAL_MODULES_JSON)
 
 
-@app.route('/api/ai/initialize-payal-decks', methods=['POST'])
+@bp.route('/api/ai/initialize-payal-decks', methods=['POST'])
 @login_required
 def initialize_payal_decks():
     """Create the 8 standard decks for Payal (Class 11 & 12 for Physics, Chemistry, Math, Biology)"""
@@ -1107,54 +1507,39 @@ def initialize_payal_decks():
         }), 500
 
 
-@app.route('/api/ai/modules-payal/<module_name>/topics', methods=['GET'])
+@bp.route('/api/ai/modules-payal/<module_name>/topics', methods=['GET'])
 @login_required
+@static_etag(syllabus_catalog.ETAG, max_age=syllabus_catalog.CACHE_MAX_AGE)
 def get_ai_topics_payal(module_name):
     """Get topics for a specific class-subject combination in Payal's generator"""
     # Parse module_name like "Class 11 - Physics"
-    try:
-        parts = module_name.split(' - ')
-        if len(parts) != 2:
-            return jsonify({'success': False, 'error': 'Invalid module format'}), 400
-        
-        class_part = parts[0].strip()  # "Class 11" or "Class 12"
-        subject = parts[1].strip()      # "Physics", "Chemistry", etc.
-        
-        # Determine which class
-        class_key = PAYAL_CLASS_LABEL_TO_KEY.get(class_part)
-        if not class_key:
-            return jsonify({'success': False, 'error': 'Invalid class'}), 400
-        
-        # Get topics for this subject and class
-        if subject not in PAYAL_SUBJECTS:
-            return jsonify({'success': False, 'error': 'Invalid subject'}), 400
-        
-        topics = PAYAL_SUBJECTS[subject].get(class_key, [])
-        
-        return jsonify({
-            'success': True,
-            'topics': topics
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
+    parts = module_name.split(' - ')
+    if len(parts) != 2:
+        return jsonify({'success': False, 'error': 'Invalid module format'}), 400
+
+    class_part = parts[0].strip()  # "Class 11" or "Class 12"
+    subject = parts[1].strip()      # "Physics", "Chemistry", etc.
+    if class_part not in PAYAL_CLASS_LABEL_TO_KEY:
+        return jsonify({'success': False, 'error': 'Invalid class'}), 400
 
+    body = syllabus_catalog.payal_topics_json(class_part, subject)
+    if body is None:
+        return jsonify({'success': False, 'error': 'Invalid subject'}), 400
+    return syllabus_catalog.json_response(body)
 
-@app.route('/api/ai/modules/<module_name>/topics', methods=['GET'])
+
+@bp.route('/api/ai/modules/<module_name>/topics', methods=['GET'])
 @login_required
+@static_etag(syllabus_catalog.ETAG, max_age=syllabus_catalog.CACHE_MAX_AGE)
 def get_ai_topics(module_name):
     """Get topics for a specific module in Shubham's generator"""
-    if module_name not in SYLLABUS_MODULES:
+    body = syllabus_catalog.topics_json(module_name)
+    if body is None:
         return jsonify({'success': False, 'error': 'Invalid module'}), 400
-    
-    topics = SYLLABUS_MODULES[module_name].get('topics', [])
-    
-    return jsonify({
-        'success': True,
-        'topics': topics
-    })
+    return syllabus_catalog.json_response(body)
 
 
-@app.route('/api/ai/generate-cards', methods=['POST'])
+@bp.route('/api/ai/generate-cards', methods=['POST'])
 @login_required
 def generate_ai_cards():
     """Generate flashcards using Gemini API"""
@@ -1194,7 +1579,7 @@ def generate_ai_cards():
         
         # Log request details for debugging
         topics_for_log = selected_topics if selected_topics else 'All Topics'
-        app.logger.info(f"Generating cards: module={module_name}, topics={topics_for_log}, count={count}, difficulty={difficulty}")
+        current_app.logger.info(f"Generating cards: module={module_name}, topics={topics_for_log}, count={count}, difficulty={difficulty}")
 
         topics_for_generation = selected_topics if selected_topics else None
 
@@ -1218,36 +1603,36 @@ def generate_ai_cards():
             
             # Generate easy cards
             if easy_count > 0:
-                app.logger.info(f"Generating {easy_count} easy cards")
+                current_app.logger.info(f"Generating {easy_count} easy cards")
                 result = generator.generate_flashcards(module_name, topics_for_generation, easy_count, 'easy')
                 if result.get('success'):
                     for card in result['cards']:
                         card['difficulty'] = 'easy'
                     all_flashcards.extend(result['cards'])
                 else:
-                    app.logger.error(f"Easy cards generation failed: {result.get('error')}")
+                    current_app.logger.error(f"Easy cards generation failed: {result.get('error')}")
             
             # Generate medium cards
             if medium_count > 0:
-                app.logger.info(f"Generating {medium_count} medium cards")
+                current_app.logger.info(f"Generating {medium_count} medium cards")
                 result = generator.generate_flashcards(module_name, topics_for_generation, medium_count, 'medium')
                 if result.get('success'):
                     for card in result['cards']:
                         card['difficulty'] = 'medium'
                     all_flashcards.extend(result['cards'])
                 else:
-                    app.logger.error(f"Medium cards generation failed: {result.get('error')}")
+                    current_app.logger.error(f"Medium cards generation failed: {result.get('error')}")
             
             # Generate hard cards
             if hard_count > 0:
-                app.logger.info(f"Generating {hard_count} hard cards")
+                current_app.logger.info(f"Generating {hard_count} hard cards")
                 result = generator.generate_flashcards(module_name, topics_for_generation, hard_count, 'hard')
                 if result.get('success'):
                     for card in result['cards']:
                         card['difficulty'] = 'hard'
                     all_flashcards.extend(result['cards'])
                 else:
-                    app.logger.error(f"Hard cards generation failed: {result.get('error')}")
+                    current_app.logger.error(f"Hard cards generation failed: {result.get('error')}")
             
             flashcards = all_flashcards
         else:
@@ -1255,7 +1640,7 @@ def generate_ai_cards():
             result = generator.generate_flashcards(module_name, topics_for_generation, count, difficulty)
             
             if not result.get('success'):
-                app.logger.error(f"Generation failed: {result.get('error')}")
+                current_app.logger.error(f"Generation failed: {result.get('error')}")
                 return jsonify({
                     'error': result.get('error', 'Failed to generate flashcards')
                 }), 500
@@ -1301,6 +1686,8 @@ def generate_ai_cards():
             cards_added += 1
         
         db.session.commit()
+        if cards_added:
+            schedule_related_rebuild(deck_id)
         
         # Format topics for response
         topics_str = ', '.join(selected_topics) if selected_topics else 'All Topics'
@@ -1327,7 +1714,7 @@ def generate_ai_cards():
         }), 500
 
 
-@app.template_filter('timeago')
+@bp.app_template_filter('timeago')
 def timeago_filter(dt):
     """Convert datetime to human-readable time ago"""
     if not dt:
@@ -1350,7 +1737,7 @@ def timeago_filter(dt):
         return 'Just now'
 
 
-@app.template_filter('future_time')
+@bp.app_template_filter('future_time')
 def future_time_filter(dt):
     """Convert future datetime to human-readable format"""
     if not dt:
@@ -1376,7 +1763,7 @@ def future_time_filter(dt):
         return 'in a moment'
 
 
-@app.route('/api/ai/generate-cards-payal', methods=['POST'])
+@bp.route('/api/ai/generate-cards-payal', methods=['POST'])
 @login_required
 def generate_ai_cards_payal():
     """Generate flashcards for Payal using Maharashtra Board context"""
@@ -1439,7 +1826,7 @@ def generate_ai_cards_payal():
                 topic_cards = 0
             if topic_cards <= 0:
                 continue
-            app.logger.info(f"Generating Payal's cards: subject={subject}, topic={topic}, count={topic_cards}, difficulty={difficulty}, exam={exam_focus}")
+            current_app.logger.info(f"Generating Payal's cards: subject={subject}, topic={topic}, count={topic_cards}, difficulty={difficulty}, exam={exam_focus}")
             
             # Generate flashcards for this topic
             flashcards = generator.generate_cards(
@@ -1497,6 +1884,8 @@ def generate_ai_cards_payal():
             cards_added += 1
         
         db.session.commit()
+        if cards_added:
+            schedule_related_rebuild(deck_id)
         
         return jsonify({
             'success': True,
@@ -1511,13 +1900,13 @@ def generate_ai_cards_payal():
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error generating Payal's cards: {str(e)}")
+        current_app.logger.error(f"Error generating Payal's cards: {str(e)}")
         return jsonify({
             'error': f'Error generating cards: {str(e)}'
         }), 500
 
 
-@app.route('/api/create-user-decks', methods=['POST'])
+@bp.route('/api/create-user-decks', methods=['POST'])
 @login_required
 def create_user_decks():
     """Create complete deck hierarchy for specific users (payal/shubham)"""
@@ -1531,120 +1920,10 @@ def create_user_decks():
                 'error': 'This feature is only available for specific users'
             }), 403
         
-        created_count = 0
-        existing_count = 0
-
-        def upsert_deck(name, parent_id=None, description=None, order_index=0, legacy_names=None):
-            deck = Deck.query.filter_by(
-                user_id=current_user.id,
-                name=name,
-                parent_id=parent_id
-            ).first()
-
-            if not deck and legacy_names:
-                for legacy_name in legacy_names:
-                    legacy_deck = Deck.query.filter_by(
-                        user_id=current_user.id,
-                        name=legacy_name,
-                        parent_id=parent_id
-                    ).first()
-                    if legacy_deck:
-                        legacy_deck.name = name
-                        deck = legacy_deck
-                        break
-
-            created_local = False
-            if not deck:
-                deck = Deck(
-                    name=name,
-                    user_id=current_user.id,
-                    parent_id=parent_id,
-                    description=description,
-                    display_order=order_index
-                )
-                db.session.add(deck)
-                db.session.flush()
-                created_local = True
-            else:
-                if deck.display_order != order_index:
-                    deck.display_order = order_index
-                if description and not deck.description:
-                    deck.description = description
-
-            return deck, created_local
-
-        if username == 'payal':
-            parent_order = 1
-            for class_key in PAYAL_CLASS_ORDER:
-                class_label = PAYAL_CLASS_LABELS.get(class_key, class_key.replace('_', ' ').title())
-                for subject in PAYAL_SUBJECT_ORDER:
-                    classes = PAYAL_SUBJECTS.get(subject, {})
-                    topics = classes.get(class_key)
-                    if not topics:
-                        continue
-
-                    parent_name = f"{class_label} - {subject}"
-                    parent_desc = f"{subject} syllabus for {class_label}"
-                    legacy_name = f"{subject} - {class_label}"
-                    parent_deck, was_created = upsert_deck(
-                        parent_name,
-                        None,
-                        parent_desc,
-                        parent_order,
-                        legacy_names=[legacy_name]
-                    )
-                    if was_created:
-                        created_count += 1
-                    else:
-                        existing_count += 1
-
-                    topic_order = 1
-                    for topic in topics:
-                        _, topic_created = upsert_deck(
-                            topic,
-                            parent_deck.id,
-                            f"Topic: {topic}",
-                            topic_order
-                        )
-                        if topic_created:
-                            created_count += 1
-                        else:
-                            existing_count += 1
-                        topic_order += 1
-
-                    parent_order += 1
-
-        elif username == 'shubham':
-            parent_order = 1
-            for module_name in SYLLABUS_MODULE_SEQUENCE:
-                module_info = SYLLABUS_MODULES[module_name]
-                parent_desc = module_info.get('description', f'{module_name} topics')
-                parent_deck, was_created = upsert_deck(
-                    module_name,
-                    None,
-                    parent_desc,
-                    parent_order
-                )
-                if was_created:
-                    created_count += 1
-                else:
-                    existing_count += 1
-
-                topic_order = 1
-                for topic in module_info.get('topics', []):
-                    _, topic_created = upsert_deck(
-                        topic,
-                        parent_deck.id,
-                        f"Topic: {topic}",
-                        topic_order
-                    )
-                    if topic_created:
-                        created_count += 1
-                    else:
-                        existing_count += 1
-                    topic_order += 1
-
-                parent_order += 1
+        tree = build_payal_deck_tree() if username == 'payal' else build_shubham_deck_tree()
+        result = provision_deck_tree(current_user.id, tree)
+        created_count = result['created']
+        existing_count = result['existing']
         
         db.session.commit()
         
@@ -1671,7 +1950,7 @@ def create_user_decks():
         }), 500
 
 
-@app.route('/api/ai/generate-cards-shubham', methods=['POST'])
+@bp.route('/api/ai/generate-cards-shubham', methods=['POST'])
 @login_required
 def generate_ai_cards_shubham():
     """Generate flashcards for Shubham (original format with code field)"""
@@ -1710,13 +1989,13 @@ def generate_ai_cards_shubham():
         
         topics_for_generation = selected_topics[0] if len(selected_topics) == 1 else (selected_topics if selected_topics else None)
         topics_for_log = selected_topics if selected_topics else 'All Topics'
-        app.logger.info(f"Generating Shubham's cards: module={module_name}, topics={topics_for_log}, count={count}, difficulty={difficulty}")
+        current_app.logger.info(f"Generating Shubham's cards: module={module_name}, topics={topics_for_log}, count={count}, difficulty={difficulty}")
         
         # Generate flashcards with code field support
         result = generator.generate_flashcards(module_name, topics_for_generation, count, difficulty)
         
         if not result.get('success'):
-            app.logger.error(f"Generation failed: {result.get('error')}")
+            current_app.logger.error(f"Generation failed: {result.get('error')}")
             return jsonify({
                 'error': result.get('error', 'Failed to generate flashcards')
             }), 500
@@ -1762,6 +2041,8 @@ def generate_ai_cards_shubham():
             cards_added += 1
         
         db.session.commit()
+        if cards_added:
+            schedule_related_rebuild(deck_id)
         
         return jsonify({
             'success': True,
@@ -1774,13 +2055,13 @@ def generate_ai_cards_shubham():
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error generating Shubham's cards: {str(e)}")
+        current_app.logger.error(f"Error generating Shubham's cards: {str(e)}")
         return jsonify({
             'error': f'Error generating cards: {str(e)}'
         }), 500
 
 
-@app.route('/api/ai/generate-payal/<int:deck_id>', methods=['POST'])
+@bp.route('/api/ai/generate-payal/<int:deck_id>', methods=['POST'])
 @login_required
 def generate_ai_cards_payal_deck(deck_id):
     """Generate flashcards for Payal with deck integration"""
@@ -1810,7 +2091,7 @@ def generate_ai_cards_payal_deck(deck_id):
         # Initialize Payal's generator
         generator = PayalFlashcardGenerator()
         
-        app.logger.info(f"Generating Payal's cards: subject={subject}, topic={topic}, num_cards={num_cards}, difficulty={difficulty}")
+        current_app.logger.info(f"Generating Payal's cards: subject={subject}, topic={topic}, num_cards={num_cards}, difficulty={difficulty}")
         
         # Generate flashcards (NO code field)
         cards = generator.generate_cards(
@@ -1839,6 +2120,8 @@ def generate_ai_cards_payal_deck(deck_id):
             cards_added += 1
         
         db.session.commit()
+        if cards_added:
+            schedule_related_rebuild(deck_id)
         
         return jsonify({
             'success': True,
@@ -1848,14 +2131,14 @@ def generate_ai_cards_payal_deck(deck_id):
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error generating Payal's cards: {str(e)}")
+        current_app.logger.error(f"Error generating Payal's cards: {str(e)}")
         return jsonify({
             'success': False,
             'error': f'Error generating cards: {str(e)}'
         }), 500
 
 
-@app.route('/api/ai/generate-shubham/<int:deck_id>', methods=['POST'])
+@bp.route('/api/ai/generate-shubham/<int:deck_id>', methods=['POST'])
 @login_required
 def generate_ai_cards_shubham_deck(deck_id):
     """Generate flashcards for Shubham with deck integration"""
@@ -1885,18 +2168,18 @@ def generate_ai_cards_shubham_deck(deck_id):
         # Initialize Shubham's generator
         generator = GeminiFlashcardGenerator()
         
-        app.logger.info(f"Generating Shubham's cards: module={module_name}, topics={topics}, num_cards={num_cards}, difficulty={difficulty}")
+        current_app.logger.info(f"Generating Shubham's cards: module={module_name}, topics={topics}, num_cards={num_cards}, difficulty={difficulty}")
         
         # Generate flashcards with code field
         result = generator.generate_flashcards(
-            module_name=module_name,
+            module=module_name,
             topics=[topics] if topics else None,
             count=num_cards,
             difficulty=difficulty
         )
         
         if not result.get('success'):
-            app.logger.error(f"Generation failed: {result.get('error')}")
+            current_app.logger.error(f"Generation failed: {result.get('error')}")
             return jsonify({
                 'success': False,
                 'error': result.get('error', 'Failed to generate flashcards')
@@ -1922,6 +2205,8 @@ def generate_ai_cards_shubham_deck(deck_id):
             cards_added += 1
         
         db.session.commit()
+        if cards_added:
+            schedule_related_rebuild(deck_id)
         
         return jsonify({
             'success': True,
@@ -1931,14 +2216,66 @@ def generate_ai_cards_shubham_deck(deck_id):
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error generating Shubham's cards: {str(e)}")
+        current_app.logger.error(f"Error generating Shubham's cards: {str(e)}")
         return jsonify({
             'success': False,
             'error': f'Error generating cards: {str(e)}'
         }), 500
 
 
+@bp.cli.command('render-cards')
+def render_cards_command():
+    """Pre-render HTML for cards that have none or an outdated version."""
+    rendered = 0
+    last_id = 0
+    # Keyset batches, each its own transaction: committing under a streaming
+    # cursor (yield_per) would close it on PostgreSQL
+    while True:
+        batch = (
+            Card.query.options(undefer_group('content'))
+            .filter(Card.id > last_id).order_by(Card.id).limit(500).all()
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for card in batch:
+            if card.rendered is None:
+                card.rendered_html = render_card(card)
+                rendered += 1
+        db.session.commit()
+        db.session.expunge_all()
+    print(f'Rendered {rendered} card(s)')
+
+
+@bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild the full-text search index from the cards table."""
+    ensure_search_index(current_app.logger)
+    if rebuild_search_index():
+        print('Rebuilt card search index')
+    else:
+        print('Nothing to rebuild: the PostgreSQL index is maintained by the database')
+
+
+@bp.cli.command('build-related-cards')
+def build_related_cards_command():
+    """Rebuild TF-IDF related-card neighbours for every deck tree."""
+    if not related_cards_available():
+        print('NumPy and SciPy are required: pip install numpy scipy')
+        return
+    trees, cards = build_all_neighbors(current_app.config['RELATED_CARDS_K'], current_app.config['RELATED_CARDS_MIN_SCORE'])
+    print(f'Indexed {cards} card(s) in {trees} deck tree(s)')
+
+
+@bp.cli.command('purge-deleted-decks')
+def purge_deleted_decks_command():
+    """Finish deleting decks that were hidden for background deletion."""
+    purged = purge_deleted_decks(current_app.config['DECK_DELETE_CHUNK_SIZE'])
+    print(f'Purged {purged} deck tree(s)')
+
+
+app = create_app()
+
+
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
     app.run(debug=True)
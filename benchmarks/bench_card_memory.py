@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: loading a 10k-card deck with and without deferred content columns.
+
+"eager" undefers the content group, which is what every Card query loaded before
+the heavy columns were deferred. "deferred" is the default query today, and
+"ids only" is what the study queue and bulk paths select.
+
+Usage: python benchmarks/bench_card_memory.py [num_cards]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Point the app at a throwaway SQLite file before it reads Config
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_file.name}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import undefer_group
+
+from app import app
+from models import db, User, Deck, Card
+
+
+def seed(num_cards):
+    """Create one user with one deck of num_cards realistically sized cards."""
+    user = User(username='bench', email='bench@example.com')
+    user.set_password('bench')
+    db.session.add(user)
+    db.session.flush()
+    deck = Deck(user_id=user.id, name='Benchmark Deck')
+    db.session.add(deck)
+    db.session.flush()
+
+    rows = [{
+        'deck_id': deck.id,
+        'question': f'Question {i}: what does this snippet print when run with Python 3? ' * 2,
+        'hint': 'Think about how the interpreter evaluates the expression. ' * 2,
+        'options': [f'Option {letter} for card {i} with some explanatory text' for letter in 'ABCD'],
+        'correct_answer': i % 4,
+        'description': 'The answer follows from the evaluation order of the expression. ' * 10,
+        'code': 'def example(values):\n    return [v * 2 for v in values if v % 2]\n' * 4,
+        'difficulty': 'medium',
+        'rendered_html': {'v': 1, 'question': '<p>rendered</p>' * 20}
+    } for i in range(num_cards)]
+    db.session.execute(insert(Card), rows)
+    db.session.commit()
+    return deck.id
+
+
+def measure(label, load):
+    db.session.expunge_all()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<10} {len(result):>8} rows {peak / 1024 / 1024:>9.1f} MiB peak {elapsed * 1000:>9.1f} ms')
+    return peak
+
+
+def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with app.app_context():
+        db.create_all()
+        deck_id = seed(num_cards)
+        print(f'Loading a {num_cards}-card deck:')
+        eager = measure('eager', lambda: Card.query.options(undefer_group('content')).filter_by(deck_id=deck_id).all())
+        deferred = measure('deferred', lambda: Card.query.filter_by(deck_id=deck_id).all())
+        measure('ids only', lambda: db.session.query(Card.id).filter(Card.deck_id == deck_id).all())
+        print(f'Deferred columns use {deferred / eager:.0%} of the eager peak memory')
+    os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Transfer size and compression cost for the heaviest pages.
+
+Seeds a synthetic dataset, then fetches a full 100-card study session (the
+study page plus every /api/session/<id>/cards page) and the index and stats
+pages with Accept-Encoding identity, gzip and br, and reports the bytes sent
+and the median server time for each.
+
+    python benchmarks/bench_compression.py
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_file.name}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, select
+
+from app import app
+from compression import brotli
+from models import db, Deck, Card
+from synthetic_data import seed_dataset
+
+SESSION_ID_RE = re.compile(r'const sessionId = (\d+);')
+QUEUE_TOKEN_RE = re.compile(r'const queueToken = "(\w+)";')
+
+
+def decode(response):
+    data = response.get_data()
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    if encoding == 'br':
+        return brotli.decompress(data)
+    return data
+
+
+def fetch(client, url, encoding):
+    """GET url; returns (decoded body, bytes sent, ms)."""
+    started = time.perf_counter()
+    response = client.get(url, headers={'Accept-Encoding': encoding})
+    elapsed = (time.perf_counter() - started) * 1000
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {url} -> {response.status_code}')
+    return decode(response), len(response.get_data()), elapsed
+
+
+def study_session(client, leaf_id, encoding):
+    """Fetch a whole mode=all study session; returns (bytes sent, ms)."""
+    html, size, elapsed = fetch(client, f'/study/{leaf_id}?mode=all', encoding)
+    session_id = int(SESSION_ID_RE.search(html.decode()).group(1))
+    token = QUEUE_TOKEN_RE.search(html.decode()).group(1)
+
+    cursor = 0
+    while cursor is not None:
+        page, page_size, page_ms = fetch(client, f'/api/session/{session_id}/cards?cursor={cursor}&queue={token}', encoding)
+        size += page_size
+        elapsed += page_ms
+        cursor = json.loads(page)['next_cursor']
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=20000, help='cards for the benchmark user')
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        with app.app_context():
+            db.create_all()
+            dataset = seed_dataset(num_users=1, cards_per_user=args.cards, extra_levels=0)
+            user = dataset['users'][0]
+            leaf_id = db.session.execute(
+                select(Card.deck_id).join(Deck).where(Deck.user_id == user['id'])
+                .group_by(Card.deck_id).order_by(func.count(Card.id).desc()).limit(1)
+            ).scalar()
+
+        client = app.test_client()
+        client.post('/login', data={'username': user['username'], 'password': 'bench'})
+        encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+        pages = {
+            'study session (100 cards)': lambda encoding: study_session(client, leaf_id, encoding),
+            'index': lambda encoding: fetch(client, '/', encoding)[1:],
+            'stats': lambda encoding: fetch(client, '/stats', encoding)[1:],
+        }
+
+        print(f"{'page':<28}{'encoding':>10}{'bytes':>11}{'ratio':>8}{'median ms':>11}")
+        for name, run in pages.items():
+            baseline = None
+            for encoding in encodings:
+                samples = [run(encoding) for _ in range(args.iterations)]
+                size = samples[-1][0]
+                baseline = baseline or size
+                median = statistics.median(ms for _, ms in samples)
+                print(f'{name:<28}{encoding:>10}{size:>11}{baseline / size:>7.1f}x{median:>11.1f}')
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
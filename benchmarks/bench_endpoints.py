@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark on a synthetic SQLite dataset.
+
+Seeds users with syllabus-shaped deck trees, cards and review history
+(see synthetic_data.py), then times the hot endpoints through the Flask test
+client: index, deck detail, study (mode select and a session), review_card,
+stats, import_deck and every AI generate endpoint with the LLM mocked out.
+
+Results are written as JSON so runs from different commits can be compared:
+
+    python benchmarks/bench_endpoints.py            # benchmarks/reports/<commit>.json
+    (apply changes)
+    python benchmarks/bench_endpoints.py --compare benchmarks/reports/<old commit>.json
+
+--compare exits with status 1 if any endpoint's median got slower than
+--max-regression (percent).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from unittest import mock
+
+# Point the app at a throwaway SQLite file before it reads Config
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_file.name}'
+os.environ['QUERY_STATS_ENABLED'] = '1'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sqlalchemy
+from sqlalchemy import func, select
+
+import app as app_module
+from app import app
+from models import db, Deck, Card
+from ai_generator import SYLLABUS_MODULES, SYLLABUS_MODULE_SEQUENCE
+from synthetic_data import make_card, seed_dataset
+
+
+class FakeGeminiGenerator:
+    """Stands in for GeminiFlashcardGenerator: instant, deterministic-shape cards."""
+    calls = 0
+
+    def __init__(self, *args, **kwargs):
+        self.rng = random.Random()
+
+    def _cards(self, count, difficulty):
+        FakeGeminiGenerator.calls += 1
+        cards = []
+        for i in range(count):
+            card = make_card(self.rng, None, with_code=True)
+            card['question'] = f'[{FakeGeminiGenerator.calls}-{i}] {card["question"]}'
+            card['explanation'] = card.pop('description')
+            card['difficulty'] = difficulty
+            cards.append(card)
+        return cards
+
+    def generate_flashcards(self, module, topics=None, count=5, difficulty='medium'):
+        return {'success': True, 'cards': self._cards(count, difficulty), 'module': module,
+                'topic': '', 'deck_name': module, 'deck_description': ''}
+
+
+class FakePayalGenerator(FakeGeminiGenerator):
+    """Stands in for PayalFlashcardGenerator.generate_cards (returns a plain list)."""
+
+    def generate_cards(self, topic, subject, num_cards=10, difficulty='medium', exam_focus='MHT-CET'):
+        return self._cards(num_cards, difficulty)
+
+
+def timed(client, method, url, iterations, **kwargs):
+    """Run a request `iterations` times (after one warm-up) and summarise latency in ms."""
+    make_kwargs = kwargs.pop('make_kwargs', None)
+
+    queries = {}
+
+    def call():
+        request_kwargs = make_kwargs() if make_kwargs else kwargs
+        started = time.perf_counter()
+        response = client.open(url() if callable(url) else url, method=method, **request_kwargs)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method} {url} -> {response.status_code}: {response.get_data(as_text=True)[:200]}')
+        # Query statistics headers from query_stats.py (last call wins)
+        queries['queries'] = int(response.headers.get('X-DB-Query-Count', 0))
+        queries['max_repeats'] = int(response.headers.get('X-DB-Max-Repeats', 0))
+        return elapsed
+
+    call()
+    samples = sorted(call() for _ in range(iterations))
+    return {
+        **queries,
+        'iterations': iterations,
+        'min_ms': round(samples[0], 2),
+        'median_ms': round(statistics.median(samples), 2),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        'mean_ms': round(statistics.fmean(samples), 2),
+        'max_ms': round(samples[-1], 2),
+    }
+
+
+def import_payload(rng, cards):
+    payload = []
+    for _ in range(cards):
+        card = make_card(rng, None, with_code=False)
+        payload.append({
+            'question': card['question'],
+            'options': card['options'],
+            'correct_answer': card['correct_answer'],
+            'hint': card['hint'],
+            'description': card['description'],
+            'difficulty': card['difficulty'],
+        })
+    return json.dumps(payload).encode()
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    with app.app_context():
+        db.create_all()
+        dataset = seed_dataset(
+            num_users=args.users, cards_per_user=args.cards, reviews_per_card=args.reviews,
+            extra_levels=args.extra_levels, seed=args.seed
+        )
+        user = dataset['users'][0]
+        roots = db.session.execute(
+            select(Deck.id).where(Deck.user_id == user['id'], Deck.parent_id.is_(None)).order_by(Deck.display_order)
+        ).scalars().all()
+        # A leaf deck with cards, and a root deck for the subtree-wide views
+        leaf_id = db.session.execute(
+            select(Card.deck_id).join(Deck).where(Deck.user_id == user['id'])
+            .group_by(Card.deck_id).order_by(func.count(Card.id).desc()).limit(1)
+        ).scalar()
+        card_ids = db.session.execute(
+            select(Card.id).join(Deck).where(Deck.user_id == user['id']).limit(500)
+        ).scalars().all()
+        module_name = SYLLABUS_MODULE_SEQUENCE[0]
+        topic = SYLLABUS_MODULES[module_name]['topics'][0]
+
+    client = app.test_client()
+    client.post('/login', data={'username': user['username'], 'password': 'bench'})
+    n = args.iterations
+    reviews = iter(range(10 ** 9))
+
+    def review_body():
+        i = next(reviews)
+        return {'json': {'card_id': card_ids[i % len(card_ids)], 'result': ['correct', 'incorrect', 'trippy'][i % 3], 'duration': 5}}
+
+    def import_body():
+        return {
+            'data': {'file': (io.BytesIO(import_payload(rng, args.import_cards)), 'bench.json'), 'format_type': 'shubham'},
+            'content_type': 'multipart/form-data'
+        }
+
+    generate = {'count': args.generate_cards, 'difficulty': 'medium'}
+    results = {}
+    with mock.patch.object(app_module, 'GeminiFlashcardGenerator', FakeGeminiGenerator), \
+            mock.patch.object(app_module, 'PayalFlashcardGenerator', FakePayalGenerator):
+        results['index'] = timed(client, 'GET', '/', n)
+        results['deck_detail'] = timed(client, 'GET', f'/deck/{roots[0]}', n)
+        results['study_select'] = timed(client, 'GET', f'/study/{leaf_id}', n)
+        results['study_all'] = timed(client, 'GET', f'/study/{leaf_id}?mode=all', n)
+        results['review_card'] = timed(client, 'POST', '/api/review', n * 5, make_kwargs=review_body)
+        results['stats'] = timed(client, 'GET', '/stats', n)
+        results['search'] = timed(client, 'GET', '/api/search?q=closure', n)
+        results['import_deck'] = timed(client, 'POST', '/import', max(3, n // 2), make_kwargs=import_body)
+        results['generate_cards'] = timed(client, 'POST', '/api/ai/generate-cards', max(3, n // 2),
+                                          json={'deck_id': leaf_id, 'module': module_name, 'topic': topic, **generate})
+        results['generate_cards_shubham'] = timed(client, 'POST', '/api/ai/generate-cards-shubham', max(3, n // 2),
+                                                  json={'deck_id': leaf_id, 'module': module_name, 'topic': topic, **generate})
+        results['generate_shubham_deck'] = timed(client, 'POST', f'/api/ai/generate-shubham/{leaf_id}', max(3, n // 2),
+                                                 json={'module': module_name, 'topic': topic, 'num_cards': args.generate_cards})
+        results['generate_cards_payal'] = timed(client, 'POST', '/api/ai/generate-cards-payal', max(3, n // 2),
+                                                json={'deck_id': leaf_id, 'module': 'Class 11 - Physics', 'topic': 'Units and Measurements', **generate})
+        results['generate_payal_deck'] = timed(client, 'POST', f'/api/ai/generate-payal/{leaf_id}', max(3, n // 2),
+                                               json={'module': 'Physics', 'topic': 'Units and Measurements', 'num_cards': args.generate_cards})
+
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'database': 'sqlite',
+            'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'max_regression')},
+            'dataset': {key: value for key, value in dataset.items() if key != 'users'},
+        },
+        'results': results,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline_path, max_regression):
+    """Print median deltas against a baseline report. Returns True if any endpoint regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nvs {baseline_path} (commit {baseline['meta'].get('commit')})")
+    print(f"{'endpoint':<26}{'before':>10}{'after':>10}{'change':>10}")
+    regressed = False
+    for name, result in report['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            print(f'{name:<26}{"-":>10}{result["median_ms"]:>10.2f}{"new":>10}')
+            continue
+        change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100 if before['median_ms'] else 0
+        flag = ''
+        if change > max_regression:
+            regressed = True
+            flag = '  <-- slower'
+        print(f'{name:<26}{before["median_ms"]:>10.2f}{result["median_ms"]:>10.2f}{change:>+9.1f}%{flag}')
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2)
+    parser.add_argument('--cards', type=int, default=5000, help='cards per user')
+    parser.add_argument('--reviews', type=int, default=3, help='mean reviews per studied card')
+    parser.add_argument('--extra-levels', type=int, default=1, help='extra deck levels nested under each topic')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--import-cards', type=int, default=100, help='cards per imported file')
+    parser.add_argument('--generate-cards', type=int, default=10, help='cards per mocked generate call')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='report path (default: benchmarks/reports/<commit>.json)')
+    parser.add_argument('--compare', help='baseline report to compare medians against')
+    parser.add_argument('--max-regression', type=float, default=20.0, help='percent slowdown that fails --compare')
+    args = parser.parse_args()
+
+    try:
+        report = run(args)
+    finally:
+        os.unlink(_db_file.name)
+
+    if not args.output:
+        reports_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports')
+        os.makedirs(reports_dir, exist_ok=True)
+        name = report['meta']['commit'] or datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+        args.output = os.path.join(reports_dir, f'{name}.json')
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    dataset = report['meta']['dataset']
+    print(f"Dataset: {dataset['decks']} decks, {dataset['cards']} cards, {dataset['reviews']} reviews "
+          f"(seeded in {dataset['seconds']}s)")
+    print(f"{'endpoint':<26}{'median':>10}{'p95':>10}{'max':>10}{'queries':>9}{'repeats':>9}  (ms)")
+    for name, result in report['results'].items():
+        print(f'{name:<26}{result["median_ms"]:>10.2f}{result["p95_ms"]:>10.2f}{result["max_ms"]:>10.2f}'
+              f'{result["queries"]:>9}{result["max_repeats"]:>9}')
+    print(f'\nReport written to {args.output}')
+
+    if args.compare and compare(report, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
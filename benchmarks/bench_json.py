@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+JSON parse and serialization cost: the json module vs fast_json.
+
+Reports the median time of:
+  - parsing deck uploads as import_deck does (sanfoundry_python_all_questions.json
+    and a synthetic deck of --cards cards)
+  - building responses from real API payloads (/api/review, a study session
+    page, a search page) with Flask's DefaultJSONProvider and FastJSONProvider
+  - encoding/decoding the Card.options values of the synthetic deck, as the
+    JSON column does
+  - POST /api/review end to end with each provider
+
+    python benchmarks/bench_json.py
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_file.name}'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import func, select
+
+import fast_json
+from app import app
+from fast_json import FastJSONProvider
+from models import db, Deck, Card
+from synthetic_data import make_card, seed_dataset
+
+SESSION_ID_RE = re.compile(r'const sessionId = (\d+);')
+QUEUE_TOKEN_RE = re.compile(r'const queueToken = "(\w+)";')
+
+
+def median_ms(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def report(name, stdlib_ms, fast_ms):
+    print(f'{name:<48}{stdlib_ms:>11.3f}{fast_ms:>11.3f}{stdlib_ms / fast_ms:>8.1f}x')
+
+
+def capture_payloads(client, user_id):
+    """Real response payloads of the JSON endpoints, parsed back into Python objects."""
+    with app.app_context():
+        leaf_id, card_id = db.session.execute(
+            select(Card.deck_id, func.min(Card.id)).join(Deck).where(Deck.user_id == user_id)
+            .group_by(Card.deck_id).order_by(func.count(Card.id).desc()).limit(1)
+        ).one()
+
+    html = client.get(f'/study/{leaf_id}?mode=all').get_data(as_text=True)
+    session_id = int(SESSION_ID_RE.search(html).group(1))
+    token = QUEUE_TOKEN_RE.search(html).group(1)
+    return {
+        '/api/review': client.post('/api/review', json={'card_id': card_id, 'result': 'correct'}).json,
+        '/api/session/<id>/cards': client.get(f'/api/session/{session_id}/cards?cursor=0&queue={token}').json,
+        '/api/search': client.get('/api/search?q=function&per_page=50').json,
+    }, card_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=2000, help='cards in the synthetic deck and dataset')
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    if fast_json.orjson is None:
+        print('orjson is not installed; fast_json falls back to the json module')
+    rng = random.Random(0)
+    deck = {'name': 'Synthetic', 'cards': [make_card(rng, None, i % 3 == 0) for i in range(args.cards)]}
+    for card in deck['cards']:
+        del card['deck_id'], card['rendered_html']
+    uploads = {'synthetic deck': json.dumps(deck).encode()}
+    with open(os.path.join(ROOT, 'sanfoundry_python_all_questions.json'), 'rb') as f:
+        uploads['sanfoundry_python_all_questions'] = f.read()
+
+    try:
+        with app.app_context():
+            db.create_all()
+            user = seed_dataset(num_users=1, cards_per_user=args.cards, extra_levels=0)['users'][0]
+        client = app.test_client()
+        client.post('/login', data={'username': user['username'], 'password': 'bench'})
+        payloads, card_id = capture_payloads(client, user['id'])
+
+        print(f"{'':<48}{'json ms':>11}{'fast ms':>11}{'speedup':>9}")
+        for name, data in uploads.items():
+            report(f'parse {name} ({len(data) // 1024} KB)',
+                   median_ms(lambda: json.loads(data), args.iterations),
+                   median_ms(lambda: fast_json.loads(data), args.iterations))
+
+        providers = {'json': DefaultJSONProvider(app), 'fast': FastJSONProvider(app)}
+        with app.app_context():
+            for name, payload in payloads.items():
+                report(f'response {name}', *(
+                    median_ms(lambda: provider.response(payload), args.iterations * 10)
+                    for provider in providers.values()
+                ))
+
+        options = [card['options'] for card in deck['cards']]
+        encoded = [json.dumps(value) for value in options]
+        report(f'column encode ({len(options)} options)',
+               median_ms(lambda: [json.dumps(value) for value in options], args.iterations),
+               median_ms(lambda: [fast_json.dumps(value) for value in options], args.iterations))
+        report(f'column decode ({len(options)} options)',
+               median_ms(lambda: [json.loads(value) for value in encoded], args.iterations),
+               median_ms(lambda: [fast_json.loads(value) for value in encoded], args.iterations))
+
+        review = {'card_id': card_id, 'result': 'correct'}
+        timings = []
+        for provider in providers.values():
+            app.json = provider
+            timings.append(median_ms(lambda: client.post('/api/review', json=review), args.iterations))
+        report('POST /api/review', *timings)
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
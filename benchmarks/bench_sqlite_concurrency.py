@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Concurrent review writes and index reads on SQLite, with and without the
+connect-time tuning in database_tuning.py (WAL, synchronous=NORMAL,
+busy_timeout, mmap/cache size, foreign keys).
+
+Each writer and reader is a separate process with its own app and engine,
+like gunicorn workers sharing one database file. Writers POST /api/review as
+fast as they can and readers GET / for --seconds. Each mode gets a fresh
+database file, because WAL mode is remembered by the file.
+
+    python benchmarks/bench_sqlite_concurrency.py
+    python benchmarks/bench_sqlite_concurrency.py --writers 4 --readers 2 --seconds 20
+
+Failed requests (typically "database is locked") are counted, not raised.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_app(env):
+    # Runs in a fresh (spawned) process: Config reads the environment on import
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import app
+    return app
+
+
+def _seed(env, args, queue):
+    app = _load_app(env)
+    from sqlalchemy import select
+    from models import db, Card, Deck
+    from synthetic_data import seed_dataset
+
+    with app.app_context():
+        dataset = seed_dataset(num_users=1, cards_per_user=args.cards, extra_levels=0, seed=args.seed)
+        user = dataset['users'][0]
+        card_ids = db.session.execute(
+            select(Card.id).join(Deck).where(Deck.user_id == user['id'])
+        ).scalars().all()
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+    queue.put((user['username'], card_ids, journal_mode))
+
+
+def _worker(role, index, env, username, card_ids, seconds, start, queue):
+    app = _load_app(env)
+    client = app.test_client()
+    client.post('/login', data={'username': username, 'password': 'bench'})
+    start.wait()
+
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    i = index
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'writer':
+                response = client.post('/api/review', json={
+                    'card_id': card_ids[i % len(card_ids)], 'result': ('correct', 'incorrect', 'trippy')[i % 3],
+                    'duration': 5
+                })
+                i += 7
+            else:
+                response = client.get('/')
+            failed = response.status_code >= 400
+        except Exception:
+            failed = True
+        if failed:
+            errors += 1
+        else:
+            latencies.append((time.perf_counter() - started) * 1000)
+    queue.put((role, latencies, errors))
+
+
+def run_mode(tuned, args):
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    env = {
+        'DATABASE_URL': f'sqlite:///{db_file.name}',
+        'SQLITE_TUNING': '1' if tuned else '0',
+        'METRICS_ENABLED': '0',
+        'SLOW_QUERY_MS': '0',
+    }
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    try:
+        seeder = ctx.Process(target=_seed, args=(env, args, queue))
+        seeder.start()
+        username, card_ids, journal_mode = queue.get()
+        seeder.join()
+
+        start = ctx.Event()
+        roles = ['writer'] * args.writers + ['reader'] * args.readers
+        workers = [
+            ctx.Process(target=_worker, args=(role, i, env, username, card_ids, args.seconds, start, queue))
+            for i, role in enumerate(roles)
+        ]
+        for worker in workers:
+            worker.start()
+        time.sleep(args.warmup)  # let every process import the app and log in
+        start.set()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(db_file.name + suffix):
+                os.unlink(db_file.name + suffix)
+
+    summary = {'journal_mode': journal_mode}
+    for role in ('writer', 'reader'):
+        latencies = sorted(ms for r, samples, _ in results if r == role for ms in samples)
+        errors = sum(e for r, _, e in results if r == role)
+        summary[role] = {
+            'ok': len(latencies),
+            'errors': errors,
+            'per_second': round(len(latencies) / args.seconds, 1),
+            'median_ms': round(statistics.median(latencies), 2) if latencies else None,
+            'p95_ms': round(latencies[int(len(latencies) * 0.95)], 2) if latencies else None,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4, help='processes posting reviews')
+    parser.add_argument('--readers', type=int, default=2, help='processes loading the index page')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=5, help='seconds allowed for workers to start')
+    parser.add_argument('--cards', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f'{args.writers} writer(s), {args.readers} reader(s), {args.seconds:g}s per mode\n')
+    print(f"{'mode':<10}{'journal':>9}{'role':>8}{'ok/s':>8}{'errors':>8}{'median':>10}{'p95':>10}  (ms)")
+    for tuned in (False, True):
+        summary = run_mode(tuned, args)
+        for role in ('writer', 'reader'):
+            r = summary[role]
+            print(f"{'tuned' if tuned else 'default':<10}{summary['journal_mode']:>9}{role:>8}{r['per_second']:>8}"
+                  f"{r['errors']:>8}{r['median_ms'] or '-':>10}{r['p95_ms'] or '-':>10}")
+
+
+if __name__ == '__main__':
+    main()
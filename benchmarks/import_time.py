@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Startup import-time budget for app.py.
+
+Every gunicorn worker boot (and every CLI script that imports the app) pays
+the cost of `import app`, so a cold worker on Render cannot answer /login
+until it is done. This imports the app in fresh interpreters, reports the
+median time and the slowest top-level imports, and exits with status 1 when
+
+  - the median is over --budget seconds, or
+  - a module that must only load on first use (the Gemini SDK, NumPy/SciPy)
+    was imported with the app.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget 0.8 --runs 7
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on the first AI request / related-cards rebuild, never at startup
+LAZY_MODULES = ('google.generativeai', 'numpy', 'scipy')
+
+PROBE = f'''
+import sys, time
+sys.path.insert(0, {ROOT!r})
+started = time.perf_counter()
+import app
+print(time.perf_counter() - started)
+print(','.join(name for name in {LAZY_MODULES!r} if name in sys.modules))
+'''
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+def run_probe(env, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', PROBE]
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f'import app failed:\n{result.stderr[-2000:]}')
+    seconds, eager = result.stdout.splitlines()[-2:]
+    return float(seconds), [name for name in eager.split(',') if name], result.stderr
+
+
+def slowest_imports(importtime_output, limit):
+    """Modules imported directly by app.py (and app itself) by cumulative microseconds."""
+    # -X importtime prints a module after its children, indented by depth, so
+    # app's direct imports are the depth-1 lines between the previous
+    # top-level line (interpreter startup) and app's own line
+    children = []
+    for line in importtime_output.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        depth = (len(match.group(3)) - 1) // 2
+        entry = (int(match.group(2)), match.group(4))
+        if depth == 0:
+            if entry[1] == 'app':
+                return sorted(children + [entry], reverse=True)[:limit]
+            children = []
+        elif depth == 1:
+            children.append(entry)
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget', type=float, default=1.0, help='maximum median seconds for `import app`')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, 'DATABASE_URL': f'sqlite:///{os.path.join(tmp, "import_time.db")}'}
+        run_probe(env)  # warm the bytecode cache
+        samples, eager = [], set()
+        for _ in range(args.runs):
+            seconds, loaded, _ = run_probe(env)
+            samples.append(seconds)
+            eager.update(loaded)
+        _, _, importtime_output = run_probe(env, importtime=True)
+
+    median = statistics.median(samples)
+    print(f'import app: median {median:.3f}s, min {min(samples):.3f}s, max {max(samples):.3f}s '
+          f'over {args.runs} runs (budget {args.budget:.3f}s)')
+    print(f"\n{'module':<40}{'cumulative ms':>14}")
+    for microseconds, name in slowest_imports(importtime_output, args.top):
+        print(f'{name:<40}{microseconds / 1000:>14.1f}')
+
+    failed = False
+    if eager:
+        print(f"\nImported at startup but should load lazily: {', '.join(sorted(eager))}")
+        failed = True
+    if median > args.budget:
+        print(f'\nOver budget by {median - args.budget:.3f}s')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
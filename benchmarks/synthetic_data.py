@@ -0,0 +1,140 @@
+"""
+Synthetic dataset for the benchmarks.
+
+Creates users whose deck trees are shaped like the real syllabus trees
+(build_shubham_deck_tree / build_payal_deck_tree, optionally nested deeper),
+fills leaf decks with realistically sized cards and gives studied cards a
+progress row and a review history spread over the last few months.
+
+Everything is written with bulk INSERTs so seeding 100k cards takes seconds.
+Call seed_dataset() inside an app context on an empty database.
+"""
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import insert, select
+
+from app import build_payal_deck_tree, build_shubham_deck_tree
+from card_renderer import render_card
+from deck_provisioning import provision_deck_tree
+from models import db, User, Deck, Card, CardProgress, Review
+
+WORDS = (
+    'function variable closure generator iterator decorator class object method inheritance '
+    'thread process memory kernel socket index query join transaction schema normal form '
+    'velocity acceleration force momentum energy equilibrium reaction oxidation molecule bond '
+    'integral derivative matrix vector probability limit function sequence cell enzyme '
+    'photosynthesis respiration hormone gene chromosome evolution ecosystem gradient model '
+    'regression classifier cluster tensor network layer optimizer loss pipeline partition'
+).split()
+
+# last_result for studied cards, roughly what real decks look like
+RESULT_WEIGHTS = {'correct': 0.6, 'incorrect': 0.25, 'trippy': 0.15}
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _deepen(tree, extra_levels, parts):
+    """Nest `parts` child decks under every leaf, `extra_levels` times."""
+    for node in tree:
+        children = node.get('children')
+        if children:
+            _deepen(children, extra_levels, parts)
+        elif extra_levels > 0:
+            node['children'] = [{'name': f"{node['name']} - Part {i + 1}"} for i in range(parts)]
+            _deepen(node['children'], extra_levels - 1, parts)
+    return tree
+
+
+def make_card(rng, deck_id, with_code):
+    card = {
+        'deck_id': deck_id,
+        'question': _sentence(rng, rng.randint(10, 30)) + '?',
+        'hint': _sentence(rng, rng.randint(6, 15)),
+        'options': [_sentence(rng, rng.randint(3, 10)) for _ in range(4)],
+        'correct_answer': rng.randrange(4),
+        'description': _sentence(rng, rng.randint(40, 120)) + '.',
+        'reference': '',
+        'code': 'def example(values):\n    return [v * 2 for v in values if v % 2]\n' if with_code else None,
+        'difficulty': rng.choice(['easy', 'medium', 'hard']),
+    }
+    card['rendered_html'] = render_card(SimpleNamespace(**card))
+    return card
+
+
+def seed_dataset(num_users=2, cards_per_user=5000, studied_ratio=0.6, reviews_per_card=3,
+                 extra_levels=1, parts=2, seed=42, batch_size=2000):
+    """Populate the database and return a summary dict (user ids, counts, timings)."""
+    rng = random.Random(seed)
+    started = datetime.utcnow()
+    now = datetime.utcnow()
+    summary = {'users': [], 'decks': 0, 'cards': 0, 'progress': 0, 'reviews': 0}
+
+    for index in range(num_users):
+        # Alternate between the programming and the school syllabus shapes
+        shubham_shape = index % 2 == 0
+        user = User(username=f'bench{index}', email=f'bench{index}@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.flush()
+
+        tree = build_shubham_deck_tree() if shubham_shape else build_payal_deck_tree()
+        provision_deck_tree(user.id, _deepen(tree, extra_levels, parts))
+        db.session.flush()
+
+        deck_rows = db.session.execute(select(Deck.id, Deck.parent_id).where(Deck.user_id == user.id)).all()
+        parents = {parent_id for _, parent_id in deck_rows if parent_id is not None}
+        leaves = [deck_id for deck_id, _ in deck_rows if deck_id not in parents]
+        summary['decks'] += len(deck_rows)
+
+        for start in range(0, cards_per_user, batch_size):
+            batch = [
+                make_card(rng, leaves[(start + i) % len(leaves)], shubham_shape and rng.random() < 0.3)
+                for i in range(min(batch_size, cards_per_user - start))
+            ]
+            card_ids = db.session.scalars(insert(Card).returning(Card.id), batch).all()
+
+            progress_rows, review_rows = [], []
+            for card_id in card_ids:
+                if rng.random() >= studied_ratio:
+                    continue
+                last_result = rng.choices(list(RESULT_WEIGHTS), weights=list(RESULT_WEIGHTS.values()))[0]
+                history = [
+                    (rng.choices(list(RESULT_WEIGHTS), weights=list(RESULT_WEIGHTS.values()))[0],
+                     now - timedelta(days=rng.uniform(0, 90)))
+                    for _ in range(max(1, int(rng.expovariate(1 / reviews_per_card))))
+                ]
+                history.sort(key=lambda item: item[1])
+                history[-1] = (last_result, history[-1][1])
+
+                counts = {result: sum(1 for r, _ in history if r == result) for result in RESULT_WEIGHTS}
+                progress_rows.append({
+                    'card_id': card_id,
+                    'correct_count': counts['correct'],
+                    'incorrect_count': counts['incorrect'],
+                    'trippy_count': counts['trippy'],
+                    'last_result': last_result,
+                    'last_reviewed': history[-1][1],
+                    'updated_at': history[-1][1],
+                })
+                review_rows.extend(
+                    {'card_id': card_id, 'rating': result, 'duration': rng.randint(3, 90), 'reviewed_at': reviewed_at}
+                    for result, reviewed_at in history
+                )
+
+            if progress_rows:
+                db.session.execute(insert(CardProgress), progress_rows)
+                db.session.execute(insert(Review), review_rows)
+            summary['cards'] += len(card_ids)
+            summary['progress'] += len(progress_rows)
+            summary['reviews'] += len(review_rows)
+            db.session.commit()
+
+        summary['users'].append({'id': user.id, 'username': user.username,
+                                 'shape': 'shubham' if shubham_shape else 'payal'})
+
+    summary['seconds'] = round((datetime.utcnow() - started).total_seconds(), 2)
+    return summary
@@ -0,0 +1,140 @@
+"""
+Server-side rendering of card content to sanitized HTML.
+
+Python port of renderContent() in static/js/content-renderer.js. Card text is
+HTML-escaped first and only our own tags are added, so the output is safe to
+mark |safe in templates. Results are stored on Card.rendered_html when a card
+is inserted or its content changes (see the listeners in models.py), so the
+study page ships ready markup and the browser renderer is only a fallback for
+cards rendered before this existed (`flask render-cards` backfills them).
+
+- Code is syntax highlighted with Pygments when installed, emitting the same
+  hljs-* classes as highlight.js so the existing theme CSS applies.
+- Math is emitted as math-inline/math-block spans; KaTeX still typesets these
+  in the browser since it has no Python implementation.
+"""
+import html
+import re
+
+try:
+    from pygments.lexers import get_lexer_by_name
+    from pygments.token import Token
+    from pygments.util import ClassNotFound
+except ImportError:  # pragma: no cover - optional dependency
+    get_lexer_by_name = None
+
+# Bump when the rendered markup changes; outdated rows fall back to client rendering
+RENDER_VERSION = 1
+
+CODE_BLOCK_RE = re.compile(r'```(\w+)?\n?([\s\S]+?)```')
+INLINE_CODE_RE = re.compile(r'`([^`]+)`')
+MATH_BLOCK_RE = re.compile(r'\$\$([\s\S]+?)\$\$')
+MATH_INLINE_RE = re.compile(r'\$([^$]+)\$')
+PLACEHOLDER_RE = re.compile(r'\x00(\d+)\x00')
+
+# Pygments token type -> highlight.js class (most specific first)
+HLJS_CLASSES = []
+if get_lexer_by_name:
+    HLJS_CLASSES = [
+        (Token.Comment, 'hljs-comment'),
+        (Token.Keyword.Constant, 'hljs-literal'),
+        (Token.Keyword, 'hljs-keyword'),
+        (Token.Name.Builtin, 'hljs-built_in'),
+        (Token.Name.Function, 'hljs-title function_'),
+        (Token.Name.Class, 'hljs-title class_'),
+        (Token.Name.Decorator, 'hljs-meta'),
+        (Token.Literal.String, 'hljs-string'),
+        (Token.Literal.Number, 'hljs-number'),
+        (Token.Operator.Word, 'hljs-keyword'),
+    ]
+
+
+def _hljs_class(token_type):
+    for parent, css_class in HLJS_CLASSES:
+        if token_type in parent:
+            return css_class
+    return None
+
+
+def highlight_code(code, language='python'):
+    """Return (inner HTML for <code>, highlighted flag)."""
+    if get_lexer_by_name is None:
+        return html.escape(code, quote=False), False
+    try:
+        lexer = get_lexer_by_name(language or 'python', stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return html.escape(code, quote=False), False
+
+    parts = []
+    for token_type, value in lexer.get_tokens(code):
+        escaped = html.escape(value, quote=False)
+        css_class = _hljs_class(token_type)
+        parts.append(f'<span class="{css_class}">{escaped}</span>' if css_class and value.strip() else escaped)
+    return ''.join(parts), True
+
+
+def _code_element(code, language):
+    inner, highlighted = highlight_code(code, language)
+    classes = f'language-{language}' + (' hljs highlighted' if highlighted else '')
+    return f'<code class="{classes}">{inner}</code>'
+
+
+def render_text(text):
+    """Render code blocks, inline code, math and basic markdown in card text."""
+    if not text:
+        return ''
+
+    # Code and math are swapped for NUL-delimited placeholders so markdown rules
+    # never touch them; NULs in the card itself would be taken for placeholders
+    text = text.replace('\x00', '')
+    protected = []
+
+    def protect(fragment):
+        protected.append(fragment)
+        return f'\x00{len(protected) - 1}\x00'
+
+    text = CODE_BLOCK_RE.sub(
+        lambda m: protect(f'<pre>{_code_element(m.group(2), m.group(1) or "python")}</pre>'), text
+    )
+    text = INLINE_CODE_RE.sub(lambda m: protect(f'<code>{html.escape(m.group(1), quote=False)}</code>'), text)
+    text = MATH_BLOCK_RE.sub(
+        lambda m: protect(f'<span class="math-block">{html.escape(m.group(1), quote=False)}</span>'), text
+    )
+    text = MATH_INLINE_RE.sub(
+        lambda m: protect(f'<span class="math-inline">{html.escape(m.group(1), quote=False)}</span>'), text
+    )
+
+    escaped = html.escape(text, quote=False)
+
+    # Bold: **text** or __text__, then italic: *text* or _text_
+    escaped = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', escaped)
+    escaped = re.sub(r'__([^_]+)__', r'<strong>\1</strong>', escaped)
+    escaped = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', escaped)
+    escaped = re.sub(r'_([^_]+)_', r'<em>\1</em>', escaped)
+
+    # Double line breaks become paragraphs, single line breaks become <br>
+    escaped = escaped.replace('\n\n', '</p><p>').replace('\n', '<br>')
+    if '</p><p>' in escaped:
+        escaped = f'<p>{escaped}</p>'
+
+    def restore(match):
+        index = int(match.group(1))
+        return protected[index] if index < len(protected) else ''
+
+    return PLACEHOLDER_RE.sub(restore, escaped)
+
+
+def render_card(card):
+    """Return the rendered_html payload for a card."""
+    options = card.options if isinstance(card.options, list) else []
+    code_html = None
+    if card.code:
+        code_html = _code_element(card.code, 'python')
+    return {
+        'v': RENDER_VERSION,
+        'question': render_text(card.question),
+        'hint': render_text(card.hint),
+        'options': [render_text(str(option)) for option in options],
+        'description': render_text(card.description),
+        'code': code_html
+    }
@@ -0,0 +1,207 @@
+"""
+Full-text search over card question, options, hint and description.
+
+The index lives in the database so it is always in sync with the cards table,
+whichever path wrote the rows (imports, AI generation, clones, bulk edits):
+  - SQLite: an external-content FTS5 table (cards_fts) maintained by triggers
+    on cards, ranked with bm25()
+  - PostgreSQL: a stored generated tsvector column (cards.search_vector) with
+    a GIN index, ranked with ts_rank_cd()
+
+ensure_search_index() creates whatever is missing and is safe to call on every
+startup; `flask rebuild-search-index` rebuilds the SQLite index from scratch.
+Query text is reduced to word tokens that are ANDed together, the last one as
+a prefix (search-as-you-type), so user input can never produce an FTS syntax
+error. Ranking cost grows with the number of matching cards, which is why
+earlier terms are not prefix-expanded.
+"""
+import html
+import re
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models import db, Deck
+
+MAX_QUERY_TERMS = 8
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Snippet highlight markers, swapped for <mark> after HTML escaping
+MARK_START, MARK_END = '\x02', '\x03'
+
+SQLITE_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5("
+    "question, options, hint, description, "
+    "content='cards', content_rowid='id', tokenize='porter unicode61')",
+
+    "CREATE TRIGGER IF NOT EXISTS cards_fts_ai AFTER INSERT ON cards BEGIN "
+    "INSERT INTO cards_fts(rowid, question, options, hint, description) "
+    "VALUES (new.id, new.question, new.options, new.hint, new.description); END",
+
+    "CREATE TRIGGER IF NOT EXISTS cards_fts_ad AFTER DELETE ON cards BEGIN "
+    "INSERT INTO cards_fts(cards_fts, rowid, question, options, hint, description) "
+    "VALUES ('delete', old.id, old.question, old.options, old.hint, old.description); END",
+
+    "CREATE TRIGGER IF NOT EXISTS cards_fts_au AFTER UPDATE OF question, options, hint, description ON cards BEGIN "
+    "INSERT INTO cards_fts(cards_fts, rowid, question, options, hint, description) "
+    "VALUES ('delete', old.id, old.question, old.options, old.hint, old.description); "
+    "INSERT INTO cards_fts(rowid, question, options, hint, description) "
+    "VALUES (new.id, new.question, new.options, new.hint, new.description); END",
+]
+
+POSTGRES_INDEX_DDL = [
+    "ALTER TABLE cards ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(question, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(hint, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(options::text, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'D')) STORED",
+
+    "CREATE INDEX IF NOT EXISTS ix_cards_search_vector ON cards USING GIN (search_vector)",
+]
+
+# Rank first, then build snippets for the returned page only.
+# bm25() column weights, in cards_fts column order: question, options, hint, description
+SQLITE_SEARCH_SQL = """
+    WITH ranked AS (
+        SELECT cards_fts.rowid AS id, bm25(cards_fts, 10.0, 2.0, 4.0, 1.0) AS rank
+        FROM cards_fts
+        JOIN cards c ON c.id = cards_fts.rowid
+        JOIN decks d ON d.id = c.deck_id
+        WHERE cards_fts MATCH :match AND d.user_id = :user_id AND d.deleted_at IS NULL
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT c.id, c.deck_id, c.question, c.difficulty,
+           snippet(cards_fts, -1, :mark_start, :mark_end, '…', 16) AS snippet
+    FROM ranked
+    JOIN cards_fts ON cards_fts.rowid = ranked.id
+    JOIN cards c ON c.id = ranked.id
+    WHERE cards_fts MATCH :match
+    ORDER BY ranked.rank
+"""
+
+POSTGRES_SEARCH_SQL = """
+    SELECT hits.id, hits.deck_id, hits.question, hits.difficulty,
+           ts_headline('english', coalesce(hits.question, '') || ' ' || coalesce(hits.description, ''),
+                       to_tsquery('english', :match), :headline_options) AS snippet
+    FROM (
+        SELECT c.id, c.deck_id, c.question, c.description, c.difficulty,
+               ts_rank_cd(c.search_vector, to_tsquery('english', :match)) AS rank
+        FROM cards c
+        JOIN decks d ON d.id = c.deck_id
+        WHERE c.search_vector @@ to_tsquery('english', :match)
+          AND d.user_id = :user_id AND d.deleted_at IS NULL
+        ORDER BY rank DESC, c.id
+        LIMIT :limit OFFSET :offset
+    ) hits
+    ORDER BY hits.rank DESC, hits.id
+"""
+
+_ready_engines = set()
+
+
+def _backend(engine):
+    return engine.dialect.name if engine.dialect.name in ('sqlite', 'postgresql') else None
+
+
+def ensure_search_index(logger=None):
+    """Create the search index for the current database if it does not exist yet."""
+    engine = db.engine
+    if engine.url in _ready_engines:
+        return
+    _ready_engines.add(engine.url)
+
+    backend = _backend(engine)
+    if backend is None:
+        return
+
+    try:
+        with engine.begin() as conn:
+            created = backend == 'sqlite' and not conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'cards_fts'"
+            )).first()
+            for ddl in SQLITE_INDEX_DDL if backend == 'sqlite' else POSTGRES_INDEX_DDL:
+                conn.execute(text(ddl))
+            if created:
+                # Index the cards that existed before the FTS table
+                conn.execute(text("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')"))
+    except OperationalError as e:
+        if logger:
+            logger.warning(f'Full-text search index unavailable: {e}')
+
+
+def rebuild_search_index():
+    """Rebuild the SQLite FTS index from the cards table (PostgreSQL needs no rebuild)."""
+    if _backend(db.engine) != 'sqlite':
+        return False
+    db.session.execute(text("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')"))
+    db.session.commit()
+    return True
+
+
+def query_terms(query):
+    return TOKEN_RE.findall(query.lower())[:MAX_QUERY_TERMS]
+
+
+def _highlight(snippet):
+    escaped = html.escape(snippet or '', quote=False)
+    return escaped.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def _deck_paths(user_id, deck_ids):
+    """Map deck id -> 'Root / Child / Leaf' using one query over the user's decks."""
+    decks = {
+        deck_id: (parent_id, name)
+        for deck_id, parent_id, name in db.session.query(Deck.id, Deck.parent_id, Deck.name)
+        .filter(Deck.user_id == user_id)
+    }
+    paths = {}
+    for deck_id in deck_ids:
+        names = []
+        current = deck_id
+        while current in decks and len(names) <= len(decks):
+            parent_id, name = decks[current]
+            names.append(name)
+            current = parent_id
+        paths[deck_id] = ' / '.join(reversed(names))
+    return paths
+
+
+def search_cards(user_id, query, page=1, per_page=20):
+    """Return (hits, has_more) for the user's cards matching query, best match first.
+
+    Each hit is a dict with card_id, deck_id, deck_path, question, difficulty and
+    snippet (HTML with <mark> around matched terms).
+    """
+    terms = query_terms(query)
+    if not terms:
+        return [], False
+
+    params = {
+        'user_id': user_id,
+        'limit': per_page + 1,  # one extra row tells us whether another page exists
+        'offset': (page - 1) * per_page,
+    }
+    if _backend(db.engine) == 'postgresql':
+        sql = POSTGRES_SEARCH_SQL
+        params['match'] = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+        params['headline_options'] = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=12'
+    else:
+        sql = SQLITE_SEARCH_SQL
+        params['match'] = ' '.join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+        params['mark_start'], params['mark_end'] = MARK_START, MARK_END
+
+    rows = db.session.execute(text(sql), params).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    paths = _deck_paths(user_id, {row.deck_id for row in rows}) if rows else {}
+    hits = [{
+        'card_id': row.id,
+        'deck_id': row.deck_id,
+        'deck_path': paths.get(row.deck_id, ''),
+        'question': row.question,
+        'difficulty': row.difficulty,
+        'snippet': _highlight(row.snippet)
+    } for row in rows]
+    return hits, has_more
@@ -1,6 +1,19 @@
 import os
+import time
 from datetime import timedelta
 
+
+def _database_url(url):
+    """Pin Render's postgres:// / postgresql:// URLs to psycopg2 (the driver in requirements.txt).
+
+    SQLAlchemy rejects the postgres:// scheme, and 2.1 defaults postgresql:// to psycopg 3.
+    """
+    for scheme in ('postgres://', 'postgresql://'):
+        if url and url.startswith(scheme):
+            return 'postgresql+psycopg2://' + url[len(scheme):]
+    return url
+
+
 class Config:
     """Application configuration"""
     
@@ -8,13 +21,96 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     
     # Database config
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
+    SQLALCHEMY_DATABASE_URI = _database_url(os.environ.get('DATABASE_URL')) or \
         'sqlite:///flashcards.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool per worker process and statement timeouts (PostgreSQL, see
+    # database_tuning.py). Endpoints not listed use DB_STATEMENT_TIMEOUT_MS.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 300))  # seconds; Render drops idle connections
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
+    DB_ENDPOINT_STATEMENT_TIMEOUTS_MS = {
+        # Hit on every card while studying: fail fast rather than tie up a worker
+        'main.review_card': 2000,
+        'main.related_cards': 2000,
+        'main.search': 5000,
+        # Bulk writes over whole decks
+        'main.import_deck': 120000,
+        'main.bulk_card_action': 60000,
+        'main.clone_deck': 60000,
+        'main.delete_deck': 60000,
+    }
+    
+    # create_app() creates tables and adds missing columns once per process
+    INIT_DATABASE_ON_STARTUP = os.environ.get('INIT_DATABASE_ON_STARTUP', '1').lower() in ('1', 'true', 'yes')
+    
+    # Applied to every new SQLite connection (see database_tuning.py); ignored on PostgreSQL
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1').lower() in ('1', 'true', 'yes')
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # ms
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -16000,  # KiB per connection
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+    }
+    
+    # Per-process cache of logged-in user identities (seconds / entries; 0 disables)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    USER_CACHE_SIZE = 1024
+    
+    # Per-request SQL statistics (always on in debug mode): response headers, logs and
+    # N+1 detection when one statement runs more than QUERY_REPEAT_THRESHOLD times
+    QUERY_STATS_ENABLED = os.environ.get('QUERY_STATS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 10))
+    QUERY_REPEAT_ACTION = os.environ.get('QUERY_REPEAT_ACTION', 'warn')  # 'warn' or 'raise'
+    
+    # Statements slower than SLOW_QUERY_MS (0 disables) are logged with their EXPLAIN plan
+    # to a rotating file in the instance folder
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', '1').lower() in ('1', 'true', 'yes')
+    SLOW_QUERY_LOG_FILE = 'slow_queries.log'
+    
+    # Prometheus metrics at /metrics (needs prometheus_client). Set PROMETHEUS_MULTIPROC_DIR
+    # under gunicorn so all workers are aggregated; METRICS_TOKEN requires a bearer token.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # gzip/brotli compression of HTML and JSON responses (see compression.py)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    COMPRESS_MIMETYPES = ['text/html', 'application/json']
+    COMPRESS_MIN_SIZE = 1024  # bytes; smaller bodies are not worth the CPU or the header
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4
+
+    # Part of every ETag, so a deploy (new templates or views) invalidates cached pages.
+    # Render sets RENDER_GIT_COMMIT; otherwise each start of the app is a new release.
+    RELEASE_ID = os.environ.get('RENDER_GIT_COMMIT') or str(int(time.time()))
+
+    # Opt-in cProfile of single requests: send PROFILING_TOKEN in an X-Profile header
+    # (or ?_profile=) and the profile is saved to instance/profiles/. Off by default.
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+    
     # Application config
     CARDS_PER_SESSION = 100
+    STUDY_PAGE_SIZE = 10  # cards per page of the study queue (first page is in the HTML)
+    STUDY_QUEUES_PER_SESSION = 8  # page loads (tabs) of one deck that can page through their queue at once
     NEW_CARDS_PER_DAY = 10
+    SEARCH_PAGE_SIZE = 20
+    SEARCH_MAX_PAGE_SIZE = 100
+    
+    # Related-card recommendations (TF-IDF neighbours within a deck tree)
+    RELATED_CARDS_K = 5
+    RELATED_CARDS_MIN_SCORE = 0.1
+    
+    # Deck deletion: trees with more cards than this are hidden and purged in the background
+    DECK_DELETE_SYNC_LIMIT = int(os.environ.get('DECK_DELETE_SYNC_LIMIT', 2000))
+    DECK_DELETE_CHUNK_SIZE = 500  # cards deleted per transaction
     
     # Spaced repetition defaults (similar to Anki)
     SR_GRADUATING_INTERVAL = 1  # days
@@ -0,0 +1,121 @@
+"""
+Engine options and connect-time tuning.
+
+engine_options() turns the DB_* settings in Config into SQLAlchemy engine
+options; create_app() merges them under SQLALCHEMY_ENGINE_OPTIONS before the
+engine is created.
+
+PostgreSQL (per worker process):
+  - pool_size + max_overflow connections; pool_timeout bounds the wait for one
+  - pool_pre_ping and pool_recycle: Render drops idle connections when the
+    service spins down, so a pooled connection is checked before use and
+    replaced once it is older than DB_POOL_RECYCLE
+  - statement_timeout: DB_STATEMENT_TIMEOUT_MS for every connection, and for
+    endpoints listed in DB_ENDPOINT_STATEMENT_TIMEOUTS_MS a SET LOCAL at the
+    start of each transaction (short for reviews, long for imports), so a
+    runaway query cannot hold a worker forever
+
+JSON columns are encoded and decoded with fast_json (orjson when installed)
+on every backend.
+
+The time spent checking out a connection is recorded by TimedQueuePool
+(flashcards_db_pool_checkout_wait_seconds, see metrics.py).
+
+SQLite: every new connection gets SQLITE_PRAGMAS. The defaults are aimed at
+one machine serving several gunicorn workers:
+  - journal_mode=WAL: readers no longer block behind a writer (and vice versa)
+  - synchronous=NORMAL: safe with WAL; commits stop fsyncing the main file
+  - busy_timeout: a writer waits for the lock instead of failing at once with
+    "database is locked"
+  - mmap_size / cache_size: reads come from the shared page cache, not syscalls
+  - foreign_keys=ON: SQLite ignores the ON DELETE CASCADE in models.py without it
+
+journal_mode is stored in the database file, so switching SQLITE_TUNING off
+later does not take an existing file out of WAL mode.
+"""
+import time
+
+from flask import has_request_context, request
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+import fast_json
+from metrics import record_pool_checkout
+from models import db
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout took."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            record_pool_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        record_pool_checkout(time.perf_counter() - started)
+        return connection
+
+
+def engine_options(config):
+    """SQLAlchemy engine options for config's database URI."""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    options = {'json_serializer': fast_json.dumps, 'json_deserializer': fast_json.loads}
+    if backend == 'postgresql':
+        options.update({
+            'poolclass': TimedQueuePool,
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': True,
+            'connect_args': {'options': f"-c statement_timeout={int(config['DB_STATEMENT_TIMEOUT_MS'])}"},
+        })
+    elif backend == 'sqlite' and url.database not in (None, '', ':memory:'):
+        # File databases already use a QueuePool; this one also records checkout time
+        options['poolclass'] = TimedQueuePool
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def init_database_tuning(app):
+    """Register the connect/transaction-time tuning for app's engine (call before it connects)."""
+    with app.app_context():
+        engine = db.engine
+
+    if engine.dialect.name == 'sqlite' and app.config['SQLITE_TUNING']:
+        pragmas = app.config['SQLITE_PRAGMAS']
+
+        @event.listens_for(engine, 'connect')
+        def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    elif engine.dialect.name == 'postgresql':
+        default_timeout = app.config['DB_STATEMENT_TIMEOUT_MS']
+        endpoint_timeouts = app.config['DB_ENDPOINT_STATEMENT_TIMEOUTS_MS']
+
+        @event.listens_for(engine, 'begin')
+        def _set_endpoint_statement_timeout(conn):
+            if not has_request_context():
+                return
+            timeout = endpoint_timeouts.get(request.endpoint)
+            if timeout is None or timeout == default_timeout:
+                return
+            # Raw cursor: runs as the first statement of the transaction that is starting,
+            # and SET LOCAL ends with it, so a pooled connection never keeps the override
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute(f'SET LOCAL statement_timeout = {int(timeout)}')
+            finally:
+                cursor.close()
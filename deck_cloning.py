@@ -0,0 +1,129 @@
+"""
+Server-side cloning of a deck and all of its subdecks.
+
+Everything is copied with INSERT ... SELECT statements, so cards never become
+Python objects:
+  - decks are copied one tree level at a time; each copy records its source id
+    in cloned_from_id and RETURNING (id, cloned_from_id) fills a temporary
+    old -> new deck id remapping table
+  - cards are copied in one statement joined against that remapping table
+  - progress (unless reset) is copied by joining new cards to their sources
+Review history stays with the original cards.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, MetaData, Table, insert, literal, select, text
+from sqlalchemy.orm import aliased
+
+from models import db, Deck, Card, CardProgress
+
+# Temporary per-connection table: old deck id -> new deck id
+clone_deck_map = Table(
+    'clone_deck_map', MetaData(),
+    Column('old_id', Integer, primary_key=True),
+    Column('new_id', Integer, nullable=False),
+    prefixes=['TEMPORARY']
+)
+
+CARD_COPY_COLUMNS = [
+    'question', 'hint', 'options', 'correct_answer', 'description',
+    'reference', 'code', 'difficulty', 'rendered_html'
+]
+
+PROGRESS_COPY_COLUMNS = [
+    'correct_count', 'incorrect_count', 'trippy_count', 'last_result', 'last_reviewed'
+]
+
+
+def _copy_deck_level(level_ids, now, root_overrides=None):
+    """INSERT ... SELECT one level of decks and record old -> new ids in the map."""
+    deck_columns = ['user_id', 'name', 'description', 'created_at', 'parent_id', 'display_order', 'cloned_from_id']
+
+    if root_overrides is not None:
+        source = select(
+            Deck.user_id,
+            literal(root_overrides['name'], Deck.name.type),
+            Deck.description,
+            literal(now, Deck.created_at.type),
+            literal(root_overrides['parent_id'], Deck.parent_id.type),
+            literal(root_overrides['display_order'], Deck.display_order.type),
+            Deck.id
+        ).where(Deck.id.in_(level_ids))
+    else:
+        source = select(
+            Deck.user_id,
+            Deck.name,
+            Deck.description,
+            literal(now, Deck.created_at.type),
+            clone_deck_map.c.new_id,
+            Deck.display_order,
+            Deck.id
+        ).join(clone_deck_map, clone_deck_map.c.old_id == Deck.parent_id).where(Deck.id.in_(level_ids))
+
+    copied = db.session.execute(
+        insert(Deck).from_select(deck_columns, source).returning(Deck.id, Deck.cloned_from_id)
+    ).all()
+
+    if copied:
+        db.session.execute(
+            insert(clone_deck_map),
+            [{'old_id': old_id, 'new_id': new_id} for new_id, old_id in copied]
+        )
+    return copied
+
+
+def clone_deck_tree(deck, name, parent_id, display_order, reset_progress=False):
+    """Copy a deck tree under parent_id. The caller commits.
+
+    Returns dict with the new root deck id and the number of decks and cards copied.
+    """
+    now = datetime.utcnow()
+    # Live subdecks only: hidden ones (deleted_at) are waiting to be purged
+    levels = deck._collect_descendant_levels()
+
+    db.session.execute(text(
+        'CREATE TEMPORARY TABLE IF NOT EXISTS clone_deck_map '
+        '(old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)'
+    ))
+    db.session.execute(clone_deck_map.delete())
+
+    overrides = {'name': name, 'parent_id': parent_id, 'display_order': display_order}
+    new_root_id = _copy_deck_level(levels[0], now, overrides)[0][0]
+    decks_copied = 1
+    for level in levels[1:]:
+        decks_copied += len(_copy_deck_level(level, now))
+
+    cards_copied = db.session.execute(
+        insert(Card).from_select(
+            ['deck_id', *CARD_COPY_COLUMNS, 'created_at', 'cloned_from_id'],
+            select(
+                clone_deck_map.c.new_id,
+                *[getattr(Card, column) for column in CARD_COPY_COLUMNS],
+                literal(now, Card.created_at.type),
+                Card.id
+            ).join(clone_deck_map, clone_deck_map.c.old_id == Card.deck_id)
+        )
+    ).rowcount
+
+    if not reset_progress:
+        new_cards = aliased(Card, name='new_cards')
+        db.session.execute(
+            insert(CardProgress).from_select(
+                ['card_id', *PROGRESS_COPY_COLUMNS, 'updated_at'],
+                select(
+                    new_cards.id,
+                    *[getattr(CardProgress, column) for column in PROGRESS_COPY_COLUMNS],
+                    literal(now, CardProgress.updated_at.type)
+                ).select_from(new_cards)
+                .join(clone_deck_map, clone_deck_map.c.new_id == new_cards.deck_id)
+                .join(CardProgress, CardProgress.card_id == new_cards.cloned_from_id)
+            )
+        )
+
+    db.session.execute(clone_deck_map.delete())
+
+    return {
+        'deck_id': new_root_id,
+        'decks_copied': decks_copied,
+        'cards_copied': cards_copied
+    }
@@ -0,0 +1,121 @@
+"""
+Set-based deletion of decks and cards.
+
+Rows are removed with DELETE ... WHERE id IN (...) statements, bottom-up
+(reviews/progress/neighbours -> cards -> sessions -> decks), so nothing is loaded into
+the ORM just to be deleted. This works whether or not the database already has
+the ON DELETE CASCADE constraints (see fix_foreign_keys.py).
+
+Large deck trees are hidden immediately (deleted_at) and purged in chunks by a
+daemon thread in the worker that served the request. A worker restart
+(gunicorn's max_requests) or a redeploy kills that thread mid-purge. The only
+recovery is purge_deleted_decks(): create_app() runs it at every startup (see
+resume_deck_purges in app.py), and `flask purge-deleted-decks` runs it on
+demand. Until then the hidden tree's rows stay in the database.
+"""
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from models import db, Deck, Card, CardNeighbors, CardProgress, Review, StudySession
+
+
+def _bulk_delete(model, criterion):
+    db.session.execute(
+        delete(model).where(criterion).execution_options(synchronize_session=False)
+    )
+
+
+def delete_cards(card_ids):
+    """Delete cards with their progress, reviews and related-card entries. The caller commits."""
+    if not card_ids:
+        return
+    _bulk_delete(CardNeighbors, CardNeighbors.card_id.in_(card_ids))
+    _bulk_delete(Review, Review.card_id.in_(card_ids))
+    _bulk_delete(CardProgress, CardProgress.card_id.in_(card_ids))
+    _bulk_delete(Card, Card.id.in_(card_ids))
+
+
+def delete_deck_levels(levels, chunk_size=500, commit_chunks=True):
+    """Delete a deck tree given as id levels (root first).
+
+    With commit_chunks (the background purge) each chunk of cards is its own
+    transaction, so a long purge never holds one huge one. Without it nothing
+    is committed and the caller commits the whole deletion at once.
+    """
+    deck_ids = [deck_id for level in levels for deck_id in level]
+
+    while True:
+        card_ids = db.session.scalars(
+            select(Card.id).where(Card.deck_id.in_(deck_ids)).limit(chunk_size)
+        ).all()
+        if not card_ids:
+            break
+        delete_cards(card_ids)
+        if commit_chunks:
+            db.session.commit()
+
+    _bulk_delete(StudySession, StudySession.deck_id.in_(deck_ids))
+    # Deepest level first so parent_id references never dangle
+    for level in reversed(levels):
+        _bulk_delete(Deck, Deck.id.in_(level))
+    if commit_chunks:
+        db.session.commit()
+
+
+def _purge_in_background(app, levels, chunk_size):
+    with app.app_context():
+        try:
+            delete_deck_levels(levels, chunk_size)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f'Background deck deletion failed for deck {levels[0][0]}: {e}')
+        finally:
+            db.session.remove()
+
+
+def schedule_deck_deletion(deck):
+    """Hide a deck tree and delete it, in the background if it is large.
+
+    Small trees are deleted on the request thread in a single transaction.
+    Returns True when the deletion was handed to a background thread.
+    """
+    levels = deck._collect_descendant_levels(include_deleted=True)
+    deck_ids = [deck_id for level in levels for deck_id in level]
+    card_count = db.session.query(Card.id).filter(Card.deck_id.in_(deck_ids)).count()
+
+    config = current_app.config
+    chunk_size = config['DECK_DELETE_CHUNK_SIZE']
+
+    if card_count <= config['DECK_DELETE_SYNC_LIMIT']:
+        delete_deck_levels(levels, chunk_size, commit_chunks=False)
+        db.session.commit()
+        return False
+
+    # Hide the whole subtree right away, then purge off the request thread
+    db.session.execute(
+        update(Deck).where(Deck.id.in_(deck_ids)).values(deleted_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    thread = threading.Thread(
+        target=_purge_in_background,
+        args=(current_app._get_current_object(), levels, chunk_size),
+        daemon=True
+    )
+    thread.start()
+    return True
+
+
+def purge_deleted_decks(chunk_size=500):
+    """Finish deleting every deck tree still marked deleted_at. Returns trees purged."""
+    hidden = db.session.query(Deck).filter(Deck.deleted_at.isnot(None)).all()
+    hidden_ids = {deck.id for deck in hidden}
+    roots = [deck for deck in hidden if deck.parent_id not in hidden_ids]
+
+    for deck in roots:
+        delete_deck_levels(deck._collect_descendant_levels(include_deleted=True), chunk_size)
+    return len(roots)
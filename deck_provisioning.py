@@ -0,0 +1,128 @@
+"""
+Bulk provisioning of deck hierarchies (syllabus modules -> topic subdecks).
+
+A desired tree is diffed against a single snapshot of the user's decks and the
+differences are applied with one INSERT per tree level plus one bulk UPDATE,
+instead of a lookup/flush round trip per deck.
+
+Tree format (list of nodes, in display order):
+    {
+        'name': 'Python Programming',
+        'description': 'Optional description, only filled in when missing',
+        'legacy_names': ['Old Name'],   # optional, renamed to 'name' when found
+        'children': [ ...same format... ]
+    }
+"""
+from sqlalchemy import insert, update
+
+from models import db, Deck, DISPLAY_ORDER_GAP
+
+
+def _deck_key(name):
+    """Normalize a deck name for matching against existing decks."""
+    return (name or '').strip().lower()
+
+
+def provision_deck_tree(user_id, tree, enforce_order=True):
+    """Create/rename/reorder the user's decks so they contain the given tree.
+
+    Args:
+        user_id: Owner of the decks
+        tree: List of node dicts (see module docstring)
+        enforce_order: If True, existing decks get display_order matching their
+            position in the tree. If False, existing decks keep their order and
+            new decks are appended after their current siblings.
+
+    Returns:
+        dict with 'created', 'existing' and 'updated' counts. The caller commits.
+    """
+    stats = {'created': 0, 'existing': 0, 'updated': 0}
+
+    # One snapshot of everything the user owns
+    snapshot = db.session.query(
+        Deck.id, Deck.parent_id, Deck.name, Deck.description, Deck.display_order
+    ).filter(Deck.user_id == user_id, Deck.deleted_at.is_(None)).all()
+
+    existing = {}
+    max_order = {}
+    for row in snapshot:
+        existing.setdefault((row.parent_id, _deck_key(row.name)), row)
+        if row.display_order is not None:
+            max_order[row.parent_id] = max(max_order.get(row.parent_id, row.display_order), row.display_order)
+
+    updates = []
+    level = [(node, None, position) for position, node in enumerate(tree, start=1)]
+
+    while level:
+        inserts = []    # row dicts for this level's INSERT
+        pending = {}    # match key -> index into inserts (duplicate names in the tree)
+        resolved = []   # (node, existing deck id or None, insert index or None)
+
+        for node, parent_id, position in level:
+            name = node['name'].strip()
+            key = (parent_id, _deck_key(name))
+            description = node.get('description')
+
+            row = existing.get(key)
+            if row is None:
+                for legacy_name in node.get('legacy_names') or []:
+                    row = existing.get((parent_id, _deck_key(legacy_name)))
+                    if row is not None:
+                        existing[key] = row
+                        break
+
+            if row is not None:
+                stats['existing'] += 1
+                changes = {}
+                if row.name != name:
+                    changes['name'] = name
+                if enforce_order and row.display_order != position * DISPLAY_ORDER_GAP:
+                    changes['display_order'] = position * DISPLAY_ORDER_GAP
+                if description and not row.description:
+                    changes['description'] = description
+                if changes:
+                    changes['id'] = row.id
+                    updates.append(changes)
+                resolved.append((node, row.id, None))
+            elif key in pending:
+                resolved.append((node, None, pending[key]))
+            else:
+                if enforce_order:
+                    order = position * DISPLAY_ORDER_GAP
+                else:
+                    order = max_order.get(parent_id, 0) + DISPLAY_ORDER_GAP
+                    max_order[parent_id] = order
+                pending[key] = len(inserts)
+                inserts.append({
+                    'user_id': user_id,
+                    'name': name,
+                    'description': description,
+                    'parent_id': parent_id,
+                    'display_order': order
+                })
+                resolved.append((node, None, pending[key]))
+
+        new_ids = {}
+        if inserts:
+            # RETURNING rows are matched back by key rather than relying on parameter
+            # order, which keeps the INSERT batched on SQLite as well as Postgres
+            returned = db.session.execute(
+                insert(Deck).returning(Deck.id, Deck.parent_id, Deck.name),
+                inserts
+            ).all()
+            for row in returned:
+                new_ids[pending[(row.parent_id, _deck_key(row.name))]] = row.id
+            stats['created'] += len(inserts)
+
+        next_level = []
+        for node, deck_id, insert_idx in resolved:
+            parent_id = deck_id if deck_id is not None else new_ids[insert_idx]
+            for position, child in enumerate(node.get('children') or [], start=1):
+                next_level.append((child, parent_id, position))
+        level = next_level
+
+    if updates:
+        db.session.execute(update(Deck), updates)
+        stats['updated'] = len(updates)
+
+    return stats
@@ -0,0 +1,139 @@
+"""
+ETags and conditional GET for read-mostly pages and APIs.
+
+Per-user pages (@user_data_etag): users.data_version is bumped in the same
+transaction as any write to the user's decks, cards, progress, reviews or
+study sessions. Session events flag such writes: ORM flushes, and
+insert()/update()/delete() statements executed through db.session against
+those models or their tables. Raw text() SQL and writes on another
+connection are not seen; code issuing them must set
+db.session.info['user_data_changed'] itself. before_commit issues the
+UPDATE. The ETag is the version plus the release, the URL and,
+for pages showing relative times, a time bucket. A request whose
+If-None-Match matches gets a 304 after one primary-key lookup, without
+running the view.
+
+Static data (@static_etag): the syllabus endpoints never change at runtime,
+so their ETag is a hash of the data, computed once, and browsers may reuse
+them for max_age seconds before revalidating.
+
+Writes outside a request (CLI commands, background deletion/rebuilds) do not
+bump versions. They either touch nothing these pages show, or only hide
+data that the request which scheduled them already changed.
+
+Debug mode skips ETags so template edits show up immediately.
+"""
+import hashlib
+import json
+import time
+from functools import wraps
+
+from flask import current_app, has_request_context, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, select, update
+
+from models import db, User, Deck, Card, CardProgress, Review, StudySession
+
+TRACKED_MODELS = (Deck, Card, CardProgress, Review, StudySession)
+TRACKED_TABLES = frozenset(model.__table__ for model in TRACKED_MODELS)
+_CHANGED = 'user_data_changed'
+
+
+def _touches_user_data(instances):
+    return any(isinstance(instance, TRACKED_MODELS) for instance in instances)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _flag_flushed_changes(db_session, flush_context):
+    if _touches_user_data(db_session.new) or _touches_user_data(db_session.dirty) \
+            or _touches_user_data(db_session.deleted):
+        db_session.info[_CHANGED] = True
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _flag_bulk_changes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        # Core statements on Deck.__table__ etc. have no mapper, only a table
+        if getattr(orm_execute_state.statement, 'table', None) in TRACKED_TABLES \
+                or any(mapper.class_ in TRACKED_MODELS for mapper in orm_execute_state.all_mappers):
+            orm_execute_state.session.info[_CHANGED] = True
+
+
+@event.listens_for(db.session, 'before_commit')
+def _bump_data_version(db_session):
+    # before_commit runs before the final flush, so pending objects count too
+    changed = db_session.info.pop(_CHANGED, False) or _touches_user_data(db_session.new) \
+        or _touches_user_data(db_session.dirty) or _touches_user_data(db_session.deleted)
+    if changed and has_request_context() and current_user.is_authenticated:
+        db_session.execute(
+            update(User).where(User.id == current_user.id).values(data_version=User.data_version + 1)
+        )
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changes(db_session):
+    db_session.info.pop(_CHANGED, None)
+
+
+def _etag(*parts):
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+def _conditional_response(view, args, kwargs, etag, max_age=None):
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    response.cache_control.private = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        # Browsers keep the page but ask every time; the answer is usually a 304
+        response.cache_control.no_cache = True
+    return response
+
+
+def _skip_etag():
+    # A pending flash message is rendered (and consumed) by the next page
+    return request.method != 'GET' or current_app.debug or '_flashes' in session
+
+
+def user_data_etag(time_bucket=None):
+    """Decorator for login-required views whose output depends only on the user's data.
+
+    time_bucket (seconds) bounds how stale relative times ("5 minutes ago",
+    "today") may get for pages that show them.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if _skip_etag():
+                return view(*args, **kwargs)
+            version = db.session.execute(
+                select(User.data_version).where(User.id == current_user.id)
+            ).scalar()
+            bucket = int(time.time() // time_bucket) if time_bucket else ''
+            etag = _etag(current_app.config['RELEASE_ID'], current_user.id, version, request.full_path, bucket)
+            return _conditional_response(view, args, kwargs, etag)
+        return wrapper
+    return decorator
+
+
+def data_hash(*data):
+    """Stable hash of JSON-serialisable data (for static_etag)."""
+    return _etag(json.dumps(data, sort_keys=True, default=str))
+
+
+def static_etag(etag, max_age=None):
+    """Decorator for views whose output is a function of data that never changes at runtime."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if _skip_etag():
+                return view(*args, **kwargs)
+            return _conditional_response(view, args, kwargs, _etag(current_app.config['RELEASE_ID'], etag), max_age)
+        return wrapper
+    return decorator
@@ -0,0 +1,99 @@
+"""
+JSON encoding and decoding through orjson, with a stdlib fallback.
+
+When orjson is installed it is used for:
+  - app.json (FastJSONProvider): jsonify and every API response,
+    request.get_json() and the |tojson filter
+  - parsing uploaded decks in import_deck
+  - the JSON columns (Card.options, Card.rendered_html, ...), as the engine's
+    json_serializer/json_deserializer (see database_tuning.engine_options)
+
+Responses keep Flask's conventions: sorted keys, and dates, decimals, UUIDs,
+dataclasses and Markup go through Flask's default handler (orjson's native
+datetime output is switched off, so dates are still HTTP dates). orjson
+writes UTF-8 rather than \\u escapes.
+
+Anything orjson cannot handle falls back to the json module: integers beyond
+64 bits, NaN/Infinity literals in stored data, and dumps() arguments other
+than default/indent/separators. Without orjson everything uses json.
+"""
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+_ORJSON_KWARGS = frozenset(['default', 'indent', 'separators'])
+
+
+def loads(data):
+    """Parse JSON from str or UTF-8 bytes."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # json reports the error, or accepts what orjson is stricter about
+    return json.loads(data)
+
+
+def dumps(obj):
+    """Compact JSON text, as stored in the JSON columns."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj)
+
+
+def _orjson_dumps(obj, default, indent=False):
+    """UTF-8 JSON bytes with sorted keys, or None when orjson cannot encode obj."""
+    if orjson is None:
+        return None
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    try:
+        return orjson.dumps(obj, default=default, option=option)
+    except TypeError:
+        return None
+
+
+def response_body(obj):
+    """The body FastJSONProvider.response(obj) sends outside debug mode, as bytes.
+
+    For responses encoded once ahead of time (see syllabus_catalog).
+    """
+    data = _orjson_dumps(obj, DefaultJSONProvider.default)
+    if data is None:
+        data = json.dumps(obj, default=DefaultJSONProvider.default, sort_keys=True, separators=(',', ':')).encode()
+    return data + b'\n'
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's default JSON provider, encoding and decoding with orjson when it can."""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.keys() <= _ORJSON_KWARGS and kwargs.get('indent') in (None, 2):
+            data = _orjson_dumps(obj, kwargs.get('default', self.default), indent=bool(kwargs.get('indent')))
+            if data is not None:
+                return data.decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        data = _orjson_dumps(obj, self.default, indent=indent)
+        if data is None:
+            return super().response(obj)
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
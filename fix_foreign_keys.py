@@ -1,42 +1,64 @@
 #!/usr/bin/env python3
 """
 Migration script to fix foreign key constraints.
-This adds CASCADE DELETE to the study_sessions.deck_id foreign key.
+This adds CASCADE DELETE to every foreign key on the deck/card tree:
+decks.parent_id, cards.deck_id, card_progress.card_id, reviews.card_id
+and study_sessions.deck_id.
 
-Run this ONCE on the production database to fix the constraint.
+Run this ONCE on the production database to fix the constraints.
 """
 
 import os
+from sqlalchemy import text
 from app import app, db
 
+# (table, column, referenced table)
+CASCADE_FOREIGN_KEYS = [
+    ('decks', 'parent_id', 'decks'),
+    ('cards', 'deck_id', 'decks'),
+    ('card_progress', 'card_id', 'cards'),
+    ('reviews', 'card_id', 'cards'),
+    ('study_sessions', 'deck_id', 'decks'),
+]
+
 def fix_foreign_keys():
     """Fix foreign key constraints in the database"""
     with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            # SQLite cannot alter constraints in place; new databases get them from models.py
+            # and deck_deletion.py deletes bottom-up, so older files keep working without them.
+            print("Skipping: only PostgreSQL constraints can be altered in place.")
+            return
+
         try:
             # For PostgreSQL, we need to drop and recreate the constraint
             # This is safe because we're adding CASCADE, not removing it
-            
+
             print("Fixing foreign key constraints...")
-            
-            # Drop the old constraint
-            db.session.execute("""
-                ALTER TABLE study_sessions 
-                DROP CONSTRAINT IF EXISTS study_sessions_deck_id_fkey;
-            """)
-            
-            # Add the new constraint with CASCADE
-            db.session.execute("""
-                ALTER TABLE study_sessions 
-                ADD CONSTRAINT study_sessions_deck_id_fkey 
-                FOREIGN KEY (deck_id) 
-                REFERENCES decks(id) 
-                ON DELETE CASCADE;
-            """)
-            
+
+            for table, column, referenced in CASCADE_FOREIGN_KEYS:
+                constraint = f"{table}_{column}_fkey"
+
+                # Drop the old constraint
+                db.session.execute(text(f"""
+                    ALTER TABLE {table}
+                    DROP CONSTRAINT IF EXISTS {constraint};
+                """))
+
+                # Add the new constraint with CASCADE
+                db.session.execute(text(f"""
+                    ALTER TABLE {table}
+                    ADD CONSTRAINT {constraint}
+                    FOREIGN KEY ({column})
+                    REFERENCES {referenced}(id)
+                    ON DELETE CASCADE;
+                """))
+
             db.session.commit()
             print("✅ Foreign key constraints fixed successfully!")
-            print("   - study_sessions.deck_id now has ON DELETE CASCADE")
-            
+            for table, column, _ in CASCADE_FOREIGN_KEYS:
+                print(f"   - {table}.{column} now has ON DELETE CASCADE")
+
         except Exception as e:
             db.session.rollback()
             print(f"❌ Error fixing constraints: {e}")
@@ -46,10 +68,10 @@ if __name__ == '__main__':
     print("=" * 60)
     print("Foreign Key Migration Script")
     print("=" * 60)
-    
+
     # Confirm before running
     confirm = input("\n⚠️  This will modify the database schema. Continue? (yes/no): ")
-    
+
     if confirm.lower() == 'yes':
         fix_foreign_keys()
     else:
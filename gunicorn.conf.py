@@ -0,0 +1,50 @@
+"""
+Gunicorn settings (read automatically from the working directory: `gunicorn app:app`).
+
+The app is imported once in the master (preload_app) and the workers are
+forked from it, so the syllabus tables, templates and everything else built at
+import time is shared copy-on-write instead of being rebuilt per worker.
+gthread workers serve several requests per process; AI generation requests
+spend most of their time waiting on Gemini, so threads keep other users'
+requests moving without a process per request.
+
+Database connections must never be shared across processes: create_app()
+empties the pool after its startup work, and post_fork disposes whatever the
+worker inherited anyway without closing the parent's sockets.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
+# Long AI generation requests; gthread heartbeats from the main thread so this only bounds a stuck worker
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+# Recycle workers now and then so fragmentation cannot grow without bound
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+accesslog = '-'
+
+
+def pre_fork(server, worker):
+    # Move every object built at import into the permanent generation, so the
+    # workers' garbage collector does not write to (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import app
+    from models import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges from the Prometheus multiprocess files
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
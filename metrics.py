@@ -0,0 +1,169 @@
+"""
+Prometheus metrics for requests and the AI generators, served at /metrics.
+
+Per route (labelled by Flask endpoint name, so URLs with ids do not explode
+label cardinality): request count by status, latency, database time and
+query count (both taken from query_stats.py). Per generator: call latency,
+calls by outcome, valid cards returned and JSON parse failures; cards per
+minute is rate(flashcards_generator_cards_total[1m]). Database pool: time to
+check out a connection and checkouts that timed out (database_tuning.py).
+
+Under gunicorn every worker has its own memory, so set PROMETHEUS_MULTIPROC_DIR
+to an empty directory before the workers start (see render.yaml): values are
+then written to per-process files there and /metrics aggregates all workers.
+Without it the endpoint reports the current process only, which is what the
+dev server needs.
+
+prometheus_client is optional; without it (or with METRICS_ENABLED off)
+everything here is a no-op and /metrics is not registered.
+"""
+import os
+import time
+from functools import wraps
+
+from flask import Response, abort, g, request
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+    )
+except ImportError:  # pragma: no cover - optional dependency
+    Counter = None
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+GENERATION_BUCKETS = (1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+
+if Counter is not None:
+    HTTP_REQUESTS = Counter(
+        'flashcards_http_requests', 'HTTP requests handled', ['method', 'endpoint', 'status']
+    )
+    HTTP_LATENCY = Histogram(
+        'flashcards_http_request_duration_seconds', 'Time to handle a request',
+        ['method', 'endpoint'], buckets=REQUEST_BUCKETS
+    )
+    HTTP_DB_TIME = Histogram(
+        'flashcards_http_request_db_seconds', 'Time spent in database statements per request',
+        ['endpoint'], buckets=REQUEST_BUCKETS
+    )
+    HTTP_QUERIES = Histogram(
+        'flashcards_http_request_queries', 'Database statements per request',
+        ['endpoint'], buckets=QUERY_COUNT_BUCKETS
+    )
+    GENERATOR_CALLS = Counter(
+        'flashcards_generator_calls', 'AI generator calls by outcome', ['generator', 'outcome']
+    )
+    GENERATOR_LATENCY = Histogram(
+        'flashcards_generator_call_duration_seconds', 'Time for one AI generator call (includes the Gemini request)',
+        ['generator'], buckets=GENERATION_BUCKETS
+    )
+    GENERATOR_CARDS = Counter(
+        'flashcards_generator_cards', 'Valid cards returned by the AI generators', ['generator']
+    )
+    GENERATOR_PARSE_FAILURES = Counter(
+        'flashcards_generator_parse_failures', 'Gemini responses that could not be parsed as JSON', ['generator']
+    )
+    DB_POOL_CHECKOUT_WAIT = Histogram(
+        'flashcards_db_pool_checkout_wait_seconds',
+        'Time to get a connection from the pool (includes opening one and the pre-ping)',
+        buckets=POOL_WAIT_BUCKETS
+    )
+    DB_POOL_TIMEOUTS = Counter(
+        'flashcards_db_pool_timeouts', 'Pool checkouts that gave up after DB_POOL_TIMEOUT'
+    )
+
+
+def available():
+    return Counter is not None
+
+
+def _generation_outcome(result):
+    """Return (outcome, cards) for a generator result (dict with 'success' or list of cards)."""
+    if isinstance(result, dict):
+        cards = result.get('cards') or []
+        return ('success' if result.get('success') else 'error'), len(cards)
+    cards = result or []
+    return ('success' if cards else 'empty'), len(cards)
+
+
+def instrument_generator(name):
+    """Decorator for generator methods: records latency, outcome and cards returned."""
+    def decorator(func):
+        if not available():
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                GENERATOR_CALLS.labels(name, 'exception').inc()
+                raise
+            finally:
+                GENERATOR_LATENCY.labels(name).observe(time.perf_counter() - started)
+            outcome, cards = _generation_outcome(result)
+            GENERATOR_CALLS.labels(name, outcome).inc()
+            GENERATOR_CARDS.labels(name).inc(cards)
+            return result
+        return wrapper
+    return decorator
+
+
+def record_parse_failure(name):
+    if available():
+        GENERATOR_PARSE_FAILURES.labels(name).inc()
+
+
+def record_pool_checkout(seconds, timed_out=False):
+    if available():
+        DB_POOL_CHECKOUT_WAIT.observe(seconds)
+        if timed_out:
+            DB_POOL_TIMEOUTS.inc()
+
+
+def _render_metrics():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """Record request metrics for app and expose them at /metrics.
+
+    Call after init_query_stats(app): after_request hooks run in reverse
+    registration order, so this one still sees the request's query stats.
+    """
+    if not (available() and app.config['METRICS_ENABLED']):
+        return
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = g.get('metrics_started')
+        if started is None or request.endpoint == 'metrics':
+            return response
+
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_REQUESTS.labels(request.method, endpoint, response.status_code).inc()
+        HTTP_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+        stats = g.get('query_stats')
+        if stats is not None:
+            HTTP_DB_TIME.labels(endpoint).observe(stats.seconds)
+            HTTP_QUERIES.labels(endpoint).observe(stats.count)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus scrape endpoint (bearer token required when METRICS_TOKEN is set)"""
+        token = app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+        return _render_metrics()
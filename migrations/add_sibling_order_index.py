@@ -0,0 +1,57 @@
+"""
+Migration script to index decks by (user_id, parent_id, display_order)
+and spread existing display_order values out with gaps.
+Run this script after deploying the gap-based deck ordering.
+"""
+import os
+import sys
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, renumber_sibling_decks
+from models import Deck
+from sqlalchemy import text
+
+def run_migration():
+    """Create the sibling order index and renumber every deck level"""
+    with app.app_context():
+        try:
+            print("Creating ix_decks_sibling_order index...")
+            # Same statement works for PostgreSQL and SQLite
+            db.session.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_decks_sibling_order
+                ON decks (user_id, parent_id, display_order)
+            """))
+            db.session.commit()
+            print("✓ Index ready")
+            
+            print("Renumbering sibling decks with gaps...")
+            levels = db.session.query(Deck.user_id, Deck.parent_id).distinct().all()
+            for user_id, parent_id in levels:
+                renumber_sibling_decks(user_id, parent_id)
+            db.session.commit()
+            print(f"✓ Renumbered {len(levels)} deck levels")
+            
+            print("\n✓ Migration completed successfully!")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n✗ Migration failed: {str(e)}")
+            return False
+        
+        return True
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MIGRATION: Gap-based display_order for decks")
+    print("=" * 60)
+    print()
+    
+    confirm = input("Run migration? (yes/no): ")
+    if confirm.lower() == 'yes':
+        success = run_migration()
+        if not success:
+            sys.exit(1)
+    else:
+        print("Migration cancelled")
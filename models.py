@@ -2,10 +2,18 @@ from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import func
+from sqlalchemy import func, event, inspect
+from sqlalchemy.orm import deferred
+
+from card_renderer import RENDER_VERSION, render_card
 
 db = SQLAlchemy()
 
+# Spacing between sibling display_order values. Leaving gaps lets a drag-and-drop
+# reorder write only the moved deck (midpoint of its new neighbours); siblings are
+# renumbered only when two neighbours end up adjacent.
+DISPLAY_ORDER_GAP = 1024
+
 
 class User(UserMixin, db.Model):
     """User accounts"""
@@ -16,6 +24,9 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped in the same transaction as any write to the user's decks, cards or progress;
+    # the ETag of their pages (see etags.py)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     decks = db.relationship('Deck', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -33,6 +44,10 @@ class User(UserMixin, db.Model):
 class Deck(db.Model):
     """Represents a deck of flashcards"""
     __tablename__ = 'decks'
+    __table_args__ = (
+        # Serves sibling listings, MAX(display_order) and neighbour lookups on reorder
+        db.Index('ix_decks_sibling_order', 'user_id', 'parent_id', 'display_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -40,58 +55,94 @@ class Deck(db.Model):
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     # Hierarchy: support parent deck (folder) and children (subdecks)
-    parent_id = db.Column(db.Integer, db.ForeignKey('decks.id'), nullable=True)
-    parent = db.relationship('Deck', remote_side=[id], backref=db.backref('children', cascade='all, delete-orphan'))
+    parent_id = db.Column(db.Integer, db.ForeignKey('decks.id', ondelete='CASCADE'), nullable=True)
+    parent = db.relationship('Deck', remote_side=[id], backref=db.backref('children', cascade='all, delete-orphan', passive_deletes=True))
     # Display order for sorting decks at the same level
     display_order = db.Column(db.Integer, default=0)
+    # Set when the deck (and its subtree) is queued for deletion; hidden from the UI
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    # Source deck when created by cloning (maps copies back to originals during a clone)
+    cloned_from_id = db.Column(db.Integer, nullable=True)
 
-    # Relationships
-    cards = db.relationship('Card', backref='deck', lazy=True, cascade='all, delete-orphan')
-    study_sessions = db.relationship('StudySession', backref='deck', lazy=True, cascade='all, delete-orphan')
+    # Relationships (rows are removed by ON DELETE CASCADE, never loaded just to delete them)
+    cards = db.relationship('Card', backref='deck', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    study_sessions = db.relationship('StudySession', backref='deck', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return f'<Deck {self.name}>'
 
-    def _collect_descendant_ids(self):
+    def _collect_descendant_levels(self, include_deleted=False):
+        """Return [[this deck id], [child ids], [grandchild ids], ...] using one query.
+
+        Subdecks hidden by deleted_at (awaiting the background purge) are skipped
+        unless include_deleted, which deletion and cycle checks need.
+        """
+        children = {}
+        rows = db.session.query(Deck.id, Deck.parent_id).filter(
+            Deck.user_id == self.user_id,
+            Deck.parent_id.isnot(None)
+        )
+        if not include_deleted:
+            rows = rows.filter(Deck.deleted_at.is_(None))
+        for deck_id, parent_id in rows:
+            children.setdefault(parent_id, []).append(deck_id)
+
+        levels = [[self.id]]
+        while True:
+            next_level = [child_id for deck_id in levels[-1] for child_id in children.get(deck_id, [])]
+            if not next_level:
+                return levels
+            levels.append(next_level)
+
+    def _collect_descendant_ids(self, include_deleted=False):
         """Return list of this deck id and all descendant deck ids."""
-        ids = [self.id]
-        # Using children relationship which is lazy-loaded
-        for child in getattr(self, 'children') or []:
-            ids.extend(child._collect_descendant_ids())
-        return ids
+        return [deck_id for level in self._collect_descendant_levels(include_deleted) for deck_id in level]
 
     def get_stats(self, include_subdecks=True):
         """Get statistics for this deck. If include_subdecks, aggregate cards from all descendants."""
         # Gather deck ids to include
         deck_ids = self._collect_descendant_ids() if include_subdecks else [self.id]
 
-        # Use queries to avoid loading all objects into memory
-        total_cards = Card.query.filter(Card.deck_id.in_(deck_ids)).count()
-        if total_cards == 0:
-            return {
-                'total': 0,
-                'not_studied': 0,
-                'correct': 0,
-                'incorrect': 0,
-                'trippy': 0
-            }
-
-        # Count by last result
-        q = db.session.query(Card).outerjoin(CardProgress, Card.id == CardProgress.card_id).filter(Card.deck_id.in_(deck_ids))
-
-        # Not studied: either no CardProgress record OR CardProgress with last_result = None
-        not_studied = q.filter((CardProgress.id == None) | (CardProgress.last_result == None)).count()
-        correct = q.filter(CardProgress.last_result == 'correct').count()
-        incorrect = q.filter(CardProgress.last_result == 'incorrect').count()
-        trippy = q.filter(CardProgress.last_result == 'trippy').count()
-
-        return {
-            'total': total_cards,
-            'not_studied': not_studied,
-            'correct': correct,
-            'incorrect': incorrect,
-            'trippy': trippy
-        }
+        # One aggregate over narrow rows: card count per last_result (None = not studied)
+        counts = dict(
+            db.session.query(CardProgress.last_result, func.count(Card.id))
+            .select_from(Card)
+            .outerjoin(CardProgress, Card.id == CardProgress.card_id)
+            .filter(Card.deck_id.in_(deck_ids))
+            .group_by(CardProgress.last_result)
+            .all()
+        )
+        return stats_from_counts(counts)
+
+    @staticmethod
+    def card_counts_by_deck(user_id):
+        """Return {deck_id: {last_result: count}} for the own cards of every live deck of a user.
+
+        One grouped query for a whole deck list; callers roll counts up the tree
+        themselves instead of calling get_stats() per deck.
+        """
+        counts = {}
+        rows = (
+            db.session.query(Card.deck_id, CardProgress.last_result, func.count(Card.id))
+            .join(Deck, Card.deck_id == Deck.id)
+            .outerjoin(CardProgress, Card.id == CardProgress.card_id)
+            .filter(Deck.user_id == user_id, Deck.deleted_at.is_(None))
+            .group_by(Card.deck_id, CardProgress.last_result)
+        )
+        for deck_id, last_result, count in rows:
+            counts.setdefault(deck_id, {})[last_result] = count
+        return counts
+
+
+def stats_from_counts(counts):
+    """Build the get_stats() dict from {last_result: card count} (None = not studied)."""
+    return {
+        'total': sum(counts.values()),
+        'not_studied': counts.get(None, 0),
+        'correct': counts.get('correct', 0),
+        'incorrect': counts.get('incorrect', 0),
+        'trippy': counts.get('trippy', 0)
+    }
 
 
 class Card(db.Model):
@@ -99,35 +150,63 @@ class Card(db.Model):
     __tablename__ = 'cards'
     
     id = db.Column(db.Integer, primary_key=True)
-    deck_id = db.Column(db.Integer, db.ForeignKey('decks.id'), nullable=False)
+    deck_id = db.Column(db.Integer, db.ForeignKey('decks.id', ondelete='CASCADE'), nullable=False)
     
-    question = db.Column(db.Text, nullable=False)
-    hint = db.Column(db.Text)
-    options = db.Column(db.JSON)  # List of answer options
+    # Heavy content columns are deferred: listing/counting paths read narrow rows, and
+    # paths that render cards ask for them with options(undefer_group('content'))
+    question = deferred(db.Column(db.Text, nullable=False), group='content')
+    hint = deferred(db.Column(db.Text), group='content')
+    options = deferred(db.Column(db.JSON), group='content')  # List of answer options
     correct_answer = db.Column(db.Integer)  # Index of correct answer
-    description = db.Column(db.Text)  # Explanation after answering
+    description = deferred(db.Column(db.Text), group='content')  # Explanation after answering
     reference = db.Column(db.String(500))  # URL or reference
-    code = db.Column(db.Text)  # Optional code snippet
+    code = deferred(db.Column(db.Text), group='content')  # Optional code snippet
     difficulty = db.Column(db.String(20))  # easy, medium, hard
+    cloned_from_id = db.Column(db.Integer, nullable=True)  # Source card when copied by a deck clone
+    # Pre-rendered HTML for question/hint/options/description/code (see card_renderer.py)
+    rendered_html = deferred(db.Column(db.JSON), group='content')
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     progress = db.relationship('CardProgress', backref='card', uselist=False, 
-                              cascade='all, delete-orphan')
+                              cascade='all, delete-orphan', passive_deletes=True)
     reviews = db.relationship('Review', backref='card', lazy=True,
-                             cascade='all, delete-orphan')
+                             cascade='all, delete-orphan', passive_deletes=True)
     
     def __repr__(self):
         return f'<Card {self.id}: {self.question[:50]}>'
 
+    @property
+    def rendered(self):
+        """Pre-rendered HTML fragments, or None if missing/outdated (browser renders instead)."""
+        rendered = self.rendered_html
+        if isinstance(rendered, dict) and rendered.get('v') == RENDER_VERSION:
+            return rendered
+        return None
+
+
+CARD_CONTENT_FIELDS = ('question', 'hint', 'options', 'description', 'code')
+
+
+@event.listens_for(Card, 'before_insert')
+def _render_new_card(mapper, connection, target):
+    target.rendered_html = render_card(target)
+
+
+@event.listens_for(Card, 'before_update')
+def _rerender_edited_card(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in CARD_CONTENT_FIELDS):
+        target.rendered_html = render_card(target)
+
 
 class CardProgress(db.Model):
     """Tracks user progress for a card"""
     __tablename__ = 'card_progress'
     
     id = db.Column(db.Integer, primary_key=True)
-    card_id = db.Column(db.Integer, db.ForeignKey('cards.id'), nullable=False, unique=True)
+    card_id = db.Column(db.Integer, db.ForeignKey('cards.id', ondelete='CASCADE'), nullable=False, unique=True)
     
     # Simple tracking data
     correct_count = db.Column(db.Integer, default=0)  # Times answered correctly
@@ -142,12 +221,24 @@ class CardProgress(db.Model):
         return f'<CardProgress card_id={self.card_id} correct={self.correct_count} incorrect={self.incorrect_count} trippy={self.trippy_count}>'
 
 
+class CardNeighbors(db.Model):
+    """Precomputed most similar cards in the same deck tree (built by related_cards.py)"""
+    __tablename__ = 'card_neighbors'
+    
+    card_id = db.Column(db.Integer, db.ForeignKey('cards.id', ondelete='CASCADE'), primary_key=True)
+    neighbors = db.Column(db.JSON, nullable=False)  # [[card_id, score], ...] best first
+    built_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CardNeighbors card_id={self.card_id} count={len(self.neighbors or [])}>'
+
+
 class Review(db.Model):
     """Records individual review sessions"""
     __tablename__ = 'reviews'
     
     id = db.Column(db.Integer, primary_key=True)
-    card_id = db.Column(db.Integer, db.ForeignKey('cards.id'), nullable=False)
+    card_id = db.Column(db.Integer, db.ForeignKey('cards.id', ondelete='CASCADE'), nullable=False)
     
     rating = db.Column(db.String(10))  # again, hard, good, easy
     duration = db.Column(db.Integer)  # Time spent in seconds
@@ -168,6 +259,8 @@ class StudySession(db.Model):
     cards_correct = db.Column(db.Integer, default=0)
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     ended_at = db.Column(db.DateTime)
+    # Study queue for the current visit: {'mode': ..., 'card_ids': [...]}, served in pages
+    card_queue = db.Column(db.JSON)
     
     def __repr__(self):
         return f'<StudySession {self.id}>'
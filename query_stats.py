@@ -0,0 +1,132 @@
+"""
+Per-request SQL query statistics and N+1 detection.
+
+SQLAlchemy cursor events record every statement executed while a request is
+being handled: the query count, total database time and how many times each
+statement *fingerprint* ran (literals and IN-lists collapsed, so
+"WHERE card_id = ?" issued once per card in a loop counts as one fingerprint
+repeated N times, the signature of an N+1 pattern).
+
+When enabled (QUERY_STATS_ENABLED, or automatically in debug mode) each
+response carries X-DB-Query-Count, X-DB-Time-Ms and X-DB-Max-Repeats headers
+and a summary line is logged. A fingerprint repeated more than
+QUERY_REPEAT_THRESHOLD times is logged as a warning, or raises
+RepeatedQueryError when QUERY_REPEAT_ACTION is 'raise' (for tests and
+benchmarks that should fail on a new N+1).
+"""
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)|\(\s*%\(\w+\)s(?:\s*,\s*%\(\w+\)s)+\s*\)')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+class RepeatedQueryError(RuntimeError):
+    """Raised when a request repeats one statement more than QUERY_REPEAT_THRESHOLD times."""
+
+
+def fingerprint(statement):
+    """Normalise a SQL statement so repeats with different parameters compare equal."""
+    statement = WHITESPACE_RE.sub(' ', statement).strip()
+    statement = LITERAL_RE.sub('?', statement)
+    return IN_LIST_RE.sub('(?)', statement)
+
+
+class QueryStats:
+    """Statements executed during one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def most_repeated(self):
+        """Return (fingerprint, times) for the most repeated statement, or (None, 0)."""
+        # Fingerprinting happens here, once per distinct statement, not per execution
+        fingerprints = Counter()
+        for statement, times in self.statements.items():
+            fingerprints[fingerprint(statement)] += times
+        if not fingerprints:
+            return None, 0
+        return fingerprints.most_common(1)[0]
+
+
+def _current_stats():
+    if has_request_context():
+        return g.get('query_stats')
+    return None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats() is not None:
+        conn.info.setdefault('query_start_times', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    start_times = conn.info.get('query_start_times')
+    if stats is not None and start_times:
+        stats.record(statement, time.perf_counter() - start_times.pop())
+
+
+@event.listens_for(Engine, 'handle_error')
+def _record_failed_query(exception_context):
+    # after_cursor_execute never runs for a statement that raised; its start
+    # time would otherwise stay on the pooled connection for good
+    conn = exception_context.connection
+    start_times = conn.info.get('query_start_times') if conn is not None else None
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    stats = _current_stats()
+    if stats is not None and exception_context.statement is not None:
+        stats.record(exception_context.statement, elapsed)
+
+
+def init_query_stats(app):
+    """Collect query statistics for each request of app when enabled."""
+
+    def reporting():
+        # Checked per request: app.run(debug=True) turns debug on after import
+        return app.config['QUERY_STATS_ENABLED'] or app.debug
+
+    @app.before_request
+    def _start_query_stats():
+        # metrics.py also reads the count and database time of every request
+        if reporting() or app.config['METRICS_ENABLED']:
+            g.query_stats = QueryStats()
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None or not reporting():
+            return response
+
+        statement, repeats = stats.most_repeated()
+        db_ms = stats.seconds * 1000
+        response.headers['X-DB-Query-Count'] = str(stats.count)
+        response.headers['X-DB-Time-Ms'] = f'{db_ms:.1f}'
+        response.headers['X-DB-Max-Repeats'] = str(repeats)
+        app.logger.debug(f'{request.method} {request.path}: {stats.count} queries, {db_ms:.1f} ms in database')
+
+        threshold = app.config['QUERY_REPEAT_THRESHOLD']
+        if threshold and repeats > threshold:
+            message = (f'{request.method} {request.endpoint} ran the same statement {repeats} times '
+                       f'(threshold {threshold}): {statement[:300]}')
+            if app.config['QUERY_REPEAT_ACTION'] == 'raise':
+                raise RepeatedQueryError(message)
+            app.logger.warning(message)
+        return response
@@ -0,0 +1,246 @@
+"""
+Related-card recommendations from TF-IDF vectors.
+
+Each root deck (a syllabus subject and all of its modules/subdecks) is one
+corpus. Card text (question, options, hint, description) is turned into
+L2-normalised TF-IDF rows of a SciPy sparse matrix; cosine similarity is a
+sparse matrix product, taken a block of rows at a time so memory stays bounded,
+and only the top-k neighbours per card are kept in card_neighbors. Serving
+/api/card/<id>/related is then a primary-key lookup.
+
+`flask build-related-cards` builds every tree offline. When import, AI
+generation, cloning or a bulk move changes a tree's cards, only that tree is
+rebuilt, in a background thread: adding documents shifts IDF weights for the
+whole corpus, so the tree is the smallest unit that stays consistent, and
+rebuilding one takes milliseconds to a few seconds of CPU. Requests for a tree
+whose rebuild is already running are coalesced into one more rebuild after it,
+so back-to-back generate calls do not queue duplicate full rebuilds.
+
+NumPy/SciPy are optional; without them recommendations are simply empty.
+They are imported on first use rather than with the app, since they add
+about a quarter of a second to every worker and CLI start.
+"""
+import importlib.util
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app
+from sqlalchemy import delete, insert, select, text
+
+from models import db, Deck, Card, CardNeighbors
+
+TOKEN_RE = re.compile(r'[^\W\d_][\w+#]+', re.UNICODE)
+
+STOP_WORDS = frozenset('''
+    a about above after again all also am an and any are as at be because been before being below between
+    both but by can could did do does doing down during each few for from further had has have having he her
+    here hers him his how i if in into is it its itself just me more most my no nor not now of off on once only
+    or other our out over own same she should so some such than that the their them then there these they this
+    those through to too under until up very was we were what when where which while who whom why will with
+    would you your following correct true false given statement option options answer none
+'''.split())
+
+# Rows of the similarity matrix computed per step (block_size x cards floats in memory)
+SIMILARITY_BLOCK_SIZE = 512
+
+# Serialises rebuilds in this process so two imports into one tree do not interleave
+_rebuild_lock = threading.Lock()
+
+# Root deck ids with a rebuild thread in this process, and those of them whose
+# cards changed again after that rebuild read them
+_scheduled_roots = set()
+_stale_roots = set()
+_schedule_lock = threading.Lock()
+
+# First key of the pg_advisory_xact_lock(namespace, root deck id) taken per rebuild
+TREE_LOCK_NAMESPACE = 36
+
+
+@lru_cache(maxsize=None)
+def available():
+    return all(importlib.util.find_spec(name) is not None for name in ('numpy', 'scipy'))
+
+
+def _numeric():
+    """Import NumPy and scipy.sparse on first use (cached by the import system)."""
+    import numpy
+    from scipy import sparse
+    return numpy, sparse
+
+
+def _fold_plural(token):
+    """Cheap plural folding so 'closures' and 'closure' share a column."""
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def card_tokens(question, options, hint, description):
+    parts = [question, hint, description]
+    if isinstance(options, list):
+        parts.extend(str(option) for option in options)
+    text = ' '.join(part for part in parts if part).lower()
+    return [_fold_plural(token) for token in TOKEN_RE.findall(text) if token not in STOP_WORDS]
+
+
+def tfidf_matrix(documents):
+    """Return a CSR matrix of L2-normalised TF-IDF rows, one per token list."""
+    np, sparse = _numeric()
+    vocabulary = {}
+    rows, columns, counts = [], [], []
+    for row, tokens in enumerate(documents):
+        for term, count in Counter(tokens).items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+
+    n_docs, n_terms = len(documents), len(vocabulary)
+    columns = np.asarray(columns, dtype=np.int32)
+    document_frequency = np.bincount(columns, minlength=n_terms)
+    idf = np.log((1 + n_docs) / (1 + document_frequency)) + 1
+
+    # Sublinear term frequency (1 + log tf) keeps repeated words from dominating
+    weights = (1 + np.log(np.asarray(counts, dtype=np.float32))) * idf[columns]
+    matrix = sparse.csr_matrix((weights, (rows, columns)), shape=(n_docs, n_terms), dtype=np.float32)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def top_neighbors(matrix, k, min_score, block_size=SIMILARITY_BLOCK_SIZE):
+    """Yield [(row index, cosine score), ...] best first for every row of matrix."""
+    np, _ = _numeric()
+    n_docs = matrix.shape[0]
+    k = min(k, n_docs - 1)
+    transposed = matrix.T.tocsc()
+
+    for start in range(0, n_docs, block_size):
+        scores = (matrix[start:start + block_size] @ transposed).toarray()
+        block_rows = np.arange(scores.shape[0])
+        scores[block_rows, block_rows + start] = 0  # a card is not related to itself
+
+        if k <= 0:
+            candidates = np.empty((scores.shape[0], 0), dtype=np.intp)
+        else:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        for row, row_candidates in enumerate(candidates):
+            ordered = row_candidates[np.argsort(-scores[row, row_candidates])]
+            yield [(int(j), float(scores[row, j])) for j in ordered if scores[row, j] >= min_score]
+
+
+def _lock_tree(root_id):
+    """Serialise rebuilds of one tree across worker processes until the transaction ends.
+
+    Two workers rebuilding the same tree would otherwise both delete and insert
+    the same card_neighbors keys, and one would fail with an IntegrityError.
+    PostgreSQL gets a transaction-scoped advisory lock; SQLite already admits a
+    single writer at a time.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(
+            text('SELECT pg_advisory_xact_lock(:namespace, :root_id)'),
+            {'namespace': TREE_LOCK_NAMESPACE, 'root_id': root_id}
+        )
+
+
+def build_tree_neighbors(root, k=5, min_score=0.1):
+    """Rebuild card_neighbors for every card under root. The caller commits.
+
+    Returns the number of cards indexed.
+    """
+    _lock_tree(root.id)
+    deck_ids = root._collect_descendant_ids()
+    tree_card_ids = select(Card.id).where(Card.deck_id.in_(deck_ids))
+    db.session.execute(
+        delete(CardNeighbors).where(CardNeighbors.card_id.in_(tree_card_ids))
+        .execution_options(synchronize_session=False)
+    )
+
+    rows = db.session.execute(
+        select(Card.id, Card.question, Card.options, Card.hint, Card.description)
+        .where(Card.deck_id.in_(deck_ids)).order_by(Card.id)
+    ).all()
+    if len(rows) < 2:
+        return 0
+
+    matrix = tfidf_matrix([card_tokens(*row[1:]) for row in rows])
+    card_ids = [row.id for row in rows]
+    now = datetime.utcnow()
+    db.session.execute(insert(CardNeighbors), [
+        {
+            'card_id': card_ids[i],
+            'neighbors': [[card_ids[j], round(score, 4)] for j, score in hits],
+            'built_at': now
+        }
+        for i, hits in enumerate(top_neighbors(matrix, k, min_score))
+    ])
+    return len(rows)
+
+
+def build_all_neighbors(k=5, min_score=0.1):
+    """Rebuild every live root deck tree, committing per tree. Returns (trees, cards)."""
+    roots = Deck.query.filter(Deck.parent_id.is_(None), Deck.deleted_at.is_(None)).order_by(Deck.id).all()
+    cards = 0
+    for root in roots:
+        with _rebuild_lock:
+            cards += build_tree_neighbors(root, k, min_score)
+            db.session.commit()
+    return len(roots), cards
+
+
+def _root_deck(deck_id):
+    deck = db.session.get(Deck, deck_id)
+    while deck is not None and deck.parent_id is not None:
+        deck = db.session.get(Deck, deck.parent_id)
+    return deck
+
+
+def _rebuild_in_background(app, root_id):
+    rerun = True
+    while rerun:
+        with app.app_context():
+            try:
+                with _rebuild_lock:
+                    with _schedule_lock:
+                        _stale_roots.discard(root_id)
+                    root = db.session.get(Deck, root_id)
+                    if root is not None and root.deleted_at is None:
+                        build_tree_neighbors(root, app.config['RELATED_CARDS_K'], app.config['RELATED_CARDS_MIN_SCORE'])
+                        db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f'Related-card rebuild failed for deck {root_id}: {e}')
+            finally:
+                db.session.remove()
+        with _schedule_lock:
+            rerun = root_id in _stale_roots
+            if not rerun:
+                _scheduled_roots.discard(root_id)
+
+
+def schedule_related_rebuild(*deck_ids):
+    """Rebuild recommendations for the trees containing deck_ids off the request thread.
+
+    Call after committing. A tree already being rebuilt in this process is
+    only marked stale; its thread rebuilds it once more when it finishes.
+    """
+    if not available():
+        return
+    roots = {root.id for root in map(_root_deck, set(deck_ids)) if root is not None and root.deleted_at is None}
+    for root_id in roots:
+        with _schedule_lock:
+            if root_id in _scheduled_roots:
+                _stale_roots.add(root_id)
+                continue
+            _scheduled_roots.add(root_id)
+        thread = threading.Thread(
+            target=_rebuild_in_background,
+            args=(current_app._get_current_object(), root_id),
+            daemon=True
+        )
+        thread.start()
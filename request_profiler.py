@@ -0,0 +1,99 @@
+"""
+Opt-in cProfile profiling of individual requests.
+
+With PROFILING_ENABLED set, a request carrying the profiling token in an
+X-Profile header (or a _profile query parameter, handy in a browser) is run
+under cProfile. Two files are written to instance/profiles/:
+  - <id>.prof: pstats dump with the full call graph (snakeviz, gprof2dot, or
+    flameprof for a flamegraph)
+  - <id>.txt: the top functions by cumulative time
+and the response links them in X-Profile-Url / X-Profile-Summary-Url.
+Downloading a profile requires the same token.
+
+When PROFILING_ENABLED is off no hooks are registered, so ordinary requests
+pay nothing. PROFILING_TOKEN should be set wherever the flag is on; without
+one, any token value works but only in debug mode.
+"""
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import uuid
+from datetime import datetime
+
+from flask import abort, g, request, send_from_directory, url_for
+
+PROFILE_FILE_RE = re.compile(r'^[\w.-]+\.(prof|txt)$')
+SUMMARY_LINES = 60
+
+
+def _profiling_requested(app):
+    supplied = request.headers.get('X-Profile') or request.args.get('_profile')
+    if not supplied:
+        return False
+    token = app.config['PROFILING_TOKEN']
+    if token:
+        return hmac.compare_digest(supplied, token)
+    return app.debug
+
+
+def init_request_profiler(app):
+    """Register the profiling hooks on app if PROFILING_ENABLED.
+
+    Call before the other request hooks are registered so the profile also
+    covers them (before_request runs in registration order, after_request in
+    reverse).
+    """
+    if not app.config['PROFILING_ENABLED']:
+        return
+
+    profile_dir = os.path.join(app.instance_path, 'profiles')
+    os.makedirs(profile_dir, exist_ok=True)
+
+    @app.before_request
+    def _start_profile():
+        if request.endpoint != 'download_profile' and _profiling_requested(app):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler per process; another thread has it
+                return
+            g.profiler = profiler
+
+    @app.after_request
+    def _save_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+
+        profile_id = f"{datetime.utcnow():%Y%m%d-%H%M%S}-{request.endpoint or 'unmatched'}-{uuid.uuid4().hex[:8]}"
+        profiler.dump_stats(os.path.join(profile_dir, f'{profile_id}.prof'))
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+        with open(os.path.join(profile_dir, f'{profile_id}.txt'), 'w') as f:
+            f.write(f'{request.method} {request.full_path} -> {response.status_code}\n\n')
+            f.write(summary.getvalue())
+
+        response.headers['X-Profile-Id'] = profile_id
+        response.headers['X-Profile-Url'] = url_for('download_profile', filename=f'{profile_id}.prof')
+        response.headers['X-Profile-Summary-Url'] = url_for('download_profile', filename=f'{profile_id}.txt')
+        return response
+
+    @app.teardown_request
+    def _stop_abandoned_profile(exc):
+        # A request that failed before after_request must not leave the profiler running
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+    @app.route('/profiles/<filename>')
+    def download_profile(filename):
+        """Download a saved profile (requires the profiling token)"""
+        if not _profiling_requested(app) or not PROFILE_FILE_RE.match(filename):
+            abort(404)
+        return send_from_directory(profile_dir, filename, as_attachment=filename.endswith('.prof'))
@@ -0,0 +1,147 @@
+"""
+Slow-query log with captured plans.
+
+Every statement slower than SLOW_QUERY_MS is written to a rotating log in the
+instance folder (SLOW_QUERY_LOG_FILE) with its duration, the endpoint that
+issued it (or "-" for CLI commands and background threads), the normalised
+SQL (query_stats.fingerprint), the *shape* of its bound parameters (types
+and counts only; values such as password hashes never reach the log) and,
+on SQLite and PostgreSQL, its EXPLAIN plan.
+
+The plan is captured right after the slow statement, on the same connection
+and with the same parameters, using EXPLAIN QUERY PLAN on SQLite and plain
+EXPLAIN (never ANALYZE, which would run the statement again) on PostgreSQL.
+On PostgreSQL it runs inside a savepoint so a failing EXPLAIN cannot abort
+the request's transaction. Set SLOW_QUERY_EXPLAIN off to skip plans.
+
+SLOW_QUERY_MS = 0 disables the log; no listeners are registered then.
+"""
+import logging
+import os
+import time
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+from models import db
+from query_stats import fingerprint
+
+logger = logging.getLogger('flashcards.slow_queries')
+
+EXPLAIN_PREFIXES = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+
+
+def _value_shape(value):
+    if isinstance(value, (str, bytes, list, tuple)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany=False):
+    """Describe bound parameters by type and length, without their values."""
+    if executemany:
+        rows = list(parameters)
+        return f'{len(rows)} x {parameter_shape(rows[0])}' if rows else '0 rows'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {_value_shape(value)}' for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(_value_shape(value) for value in parameters) + ')'
+    return _value_shape(parameters)
+
+
+def _format_sqlite_plan(rows):
+    """Indent EXPLAIN QUERY PLAN rows (id, parent, notused, detail) as a tree."""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def explain(conn, statement, parameters):
+    """Return the plan for statement as a list of lines, or None if unsupported."""
+    dialect = conn.dialect.name
+    prefix = EXPLAIN_PREFIXES.get(dialect)
+    if prefix is None or not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+
+    cursor = conn.connection.cursor()
+    savepoint = dialect == 'postgresql'
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception as e:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            return [f'(EXPLAIN failed: {e})']
+        finally:
+            if savepoint:
+                cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    except Exception as e:
+        # No transaction to hold a savepoint (autocommit) or the connection is unusable
+        return [f'(EXPLAIN unavailable: {e})']
+    finally:
+        cursor.close()
+
+    if dialect == 'sqlite':
+        return _format_sqlite_plan(rows)
+    return [row[0] for row in rows]
+
+
+def init_slow_query_log(app):
+    """Log statements slower than SLOW_QUERY_MS on app's engine to the instance folder."""
+    threshold = app.config['SLOW_QUERY_MS'] / 1000
+    if threshold <= 0:
+        return
+
+    path = os.path.join(app.instance_path, app.config['SLOW_QUERY_LOG_FILE'])
+    if not any(getattr(handler, 'baseFilename', None) == path for handler in logger.handlers):
+        handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    capture_plans = app.config['SLOW_QUERY_EXPLAIN']
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start_slow_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start_times', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get('slow_query_start_times')
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        if elapsed < threshold:
+            return
+
+        endpoint = (request.endpoint or 'unmatched') if has_request_context() else '-'
+        lines = [
+            f'{elapsed * 1000:.1f} ms {endpoint}: {fingerprint(statement)}',
+            f'  params: {parameter_shape(parameters, executemany)}',
+        ]
+        plan = explain(conn, statement, parameters) if capture_plans and not executemany else None
+        if plan:
+            lines.append('  plan:')
+            lines.extend(f'    {line}' for line in plan)
+        logger.info('\n'.join(lines))
+
+    @event.listens_for(engine, 'handle_error')
+    def _discard_slow_query_timer(exception_context):
+        # A statement that raised never reaches after_cursor_execute; drop its start time
+        conn = exception_context.connection
+        start_times = conn.info.get('slow_query_start_times') if conn is not None else None
+        if start_times:
+            start_times.pop()
@@ -114,12 +114,48 @@ function showAnswer(cardId, result) {
     // Record the result
     recordReview(cardId, result);
     
+    // Suggest similar cards to reinforce a missed concept
+    if (result === 'incorrect') {
+        loadRelatedCards(cardId);
+    }
+    
     // Scroll to explanation
     setTimeout(() => {
         explanation.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
     }, 300);
 }
 
+function loadRelatedCards(cardId) {
+    const container = document.getElementById(`related-${cardId}`);
+    if (!container || container.dataset.loaded) return;
+    container.dataset.loaded = '1';
+    
+    fetch(`/api/card/${cardId}/related`)
+    .then(res => res.json())
+    .then(data => {
+        if (!data.success || data.related.length === 0) return;
+        
+        const heading = document.createElement('h4');
+        heading.textContent = '🔗 Related cards to review';
+        const list = document.createElement('ul');
+        list.style.cssText = 'margin: 0.5rem 0 0 1.25rem; padding: 0;';
+        data.related.forEach(item => {
+            const entry = document.createElement('li');
+            entry.style.marginBottom = '0.35rem';
+            entry.textContent = item.question;
+            const deckName = document.createElement('span');
+            deckName.style.cssText = 'color: var(--text-secondary); font-size: 0.85rem;';
+            deckName.textContent = ` — ${item.deck_name}`;
+            entry.appendChild(deckName);
+            list.appendChild(entry);
+        });
+        container.appendChild(heading);
+        container.appendChild(list);
+        container.style.display = 'block';
+    })
+    .catch(err => console.warn('Could not load related cards', err));
+}
+
 function showAnswerOnly(cardId) {
     const explanation = document.getElementById(`explanation-${cardId}`);
     explanation.style.display = 'block';
@@ -175,18 +211,9 @@ function nextCard() {
     currentCardIndex++;
     
     if (currentCardIndex < totalCards) {
-        // Hide current card
+        // Hide current card and show the next one (showCardAt in study.html loads pages)
         currentCard.style.display = 'none';
-        
-        // Show next card
-        const nextCard = cards[currentCardIndex];
-        nextCard.style.display = 'block';
-        
-        // Update progress
-        document.getElementById('current-card').textContent = currentCardIndex + 1;
-        
-        // Reset timer
-        cardStartTime = Date.now();
+        showCardAt(currentCardIndex);
     } else {
         // Session complete
         endStudySession();
@@ -252,15 +279,10 @@ function deleteCard(cardId, event) {
             } else {
                 // Move to next card without incrementing index
                 currentCard.remove();
-                const remainingCards = document.querySelectorAll('.flashcard');
-                
-                if (currentCardIndex >= remainingCards.length) {
-                    currentCardIndex = remainingCards.length - 1;
+                if (currentCardIndex >= totalCards) {
+                    currentCardIndex = totalCards - 1;
                 }
-                
-                remainingCards[currentCardIndex].style.display = 'block';
-                document.getElementById('current-card').textContent = currentCardIndex + 1;
-                cardStartTime = Date.now();
+                showCardAt(currentCardIndex);
             }
         } else {
             alert('Failed to delete card: ' + (data.error || 'Unknown error'));
@@ -0,0 +1,150 @@
+"""
+Fingerprinted, precompressed static assets.
+
+Build step (run on deploy, see render.yaml):
+
+    python static_assets.py
+
+copies every file under static/ to static/dist/ with a content hash in its
+name (js/main.js -> dist/js/main.3f2a9c1b7d4e.js), writes .br/.gz siblings
+for text assets when they are smaller, and records the mapping in
+static/dist/manifest.json.
+
+At runtime init_static_assets(app) loads the manifest once and:
+  - rewrites url_for('static', filename=...) to the fingerprinted name (a
+    url_defaults hook, so templates need no changes)
+  - serves fingerprinted files with Cache-Control: public, max-age=1 year,
+    immutable; a changed file gets a new name, so browsers never revalidate
+  - sends the precompressed sibling that matches Accept-Encoding, so nothing
+    is compressed per request
+
+Without a manifest (a fresh checkout) or in debug mode, static files are
+served by Flask as before, so edits show up without rebuilding.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import sys
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+COMPRESSIBLE_EXTENSIONS = frozenset(['.css', '.js', '.json', '.map', '.svg', '.txt', '.html'])
+# (Accept-Encoding token, file suffix), best first
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def fingerprinted_name(path, data):
+    root, ext = os.path.splitext(path)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def _write_compressed(target, data):
+    """Write .br/.gz siblings of target when they save bytes; return the encodings written."""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    written = []
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            with open(target + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(suffix)
+    return written
+
+
+def build(static_folder):
+    """Rebuild static/dist from static/ and return the manifest."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+
+    manifest = {}
+    for directory, subdirs, files in os.walk(static_folder):
+        if os.path.abspath(directory) == os.path.abspath(static_folder):
+            subdirs[:] = [d for d in subdirs if d != DIST_DIR]
+        for name in sorted(files):
+            source = os.path.join(directory, name)
+            relative = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            fingerprinted = f'{DIST_DIR}/{fingerprinted_name(relative, data)}'
+            target = os.path.join(static_folder, fingerprinted)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            if os.path.splitext(name)[1] in COMPRESSIBLE_EXTENSIONS:
+                _write_compressed(target, data)
+            manifest[relative] = fingerprinted
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def init_static_assets(app):
+    """Serve fingerprinted assets from the build manifest, if one exists."""
+    manifest = load_manifest(app.static_folder)
+    if not manifest:
+        return
+
+    fingerprinted = {}
+    for path in manifest.values():
+        target = os.path.join(app.static_folder, path)
+        fingerprinted[path] = [
+            (encoding, suffix) for encoding, suffix in PRECOMPRESSED if os.path.exists(target + suffix)
+        ]
+
+    @app.url_defaults
+    def _fingerprint_static_url(endpoint, values):
+        if endpoint == 'static' and not app.debug:
+            values['filename'] = manifest.get(values.get('filename'), values.get('filename'))
+
+    serve_original = app.view_functions['static']
+
+    def static(filename):
+        encodings = fingerprinted.get(filename)
+        if encodings is None:
+            return serve_original(filename=filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, suffix in encodings:
+            if request.accept_encodings.quality(encoding):
+                response = send_from_directory(app.static_folder, filename + suffix, mimetype=mimetype,
+                                               max_age=IMMUTABLE_MAX_AGE)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(app.static_folder, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+        if encodings:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
+
+
+if __name__ == '__main__':
+    static_folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    built = build(static_folder)
+    print(f'Fingerprinted {len(built)} static file(s) into {os.path.join(static_folder, DIST_DIR)}')
@@ -0,0 +1,79 @@
+"""
+Syllabus catalog behind the AI generator's module and topic endpoints.
+
+SYLLABUS_MODULES and PAYAL_SUBJECTS only change with a deploy, so every
+response body of /api/ai/modules, /api/ai/modules-payal and their /topics
+endpoints is built and JSON-encoded once, at import (in the gunicorn master
+with preload_app). The views look up ready bytes by module name, or by class
+label and subject, and never touch the JSON encoder.
+
+ETAG identifies the catalog for @static_etag; browsers may reuse a response
+for CACHE_MAX_AGE seconds and then revalidate it.
+"""
+from flask import current_app
+
+from ai_generator import SYLLABUS_MODULES
+from ai_generator_payal import (
+    PAYAL_SUBJECTS,
+    PAYAL_SUBJECT_ORDER,
+    PAYAL_CLASS_ORDER,
+    PAYAL_CLASS_LABELS,
+    PAYAL_CLASS_LABEL_TO_KEY
+)
+from etags import data_hash
+from fast_json import response_body
+
+CACHE_MAX_AGE = 3600
+
+ETAG = data_hash(SYLLABUS_MODULES, PAYAL_SUBJECTS, PAYAL_SUBJECT_ORDER, PAYAL_CLASS_ORDER, PAYAL_CLASS_LABELS)
+
+
+def _class_label(class_key):
+    return PAYAL_CLASS_LABELS.get(class_key, class_key.replace('_', ' ').title())
+
+
+def _payal_module_list():
+    """Ordered 'Class 11 - Physics' style names."""
+    modules = []
+    for class_key in PAYAL_CLASS_ORDER:
+        for subject in PAYAL_SUBJECT_ORDER:
+            if class_key in PAYAL_SUBJECTS.get(subject, {}):
+                modules.append(f"{_class_label(class_key)} - {subject}")
+    return modules
+
+
+MODULES_JSON = response_body({
+    'success': True,
+    'modules': [
+        {'name': name, 'hours': info['hours'], 'topics': info['topics']}
+        for name, info in SYLLABUS_MODULES.items()
+    ]
+})
+
+PAYAL_MODULES_JSON = response_body({'success': True, 'modules': _payal_module_list()})
+
+_TOPICS_JSON = {
+    name: response_body({'success': True, 'topics': info.get('topics', [])})
+    for name, info in SYLLABUS_MODULES.items()
+}
+
+# (class label, subject) -> body; a subject missing from a class has no topics
+_PAYAL_TOPICS_JSON = {
+    (class_label, subject): response_body({'success': True, 'topics': class_map.get(class_key, [])})
+    for class_label, class_key in PAYAL_CLASS_LABEL_TO_KEY.items()
+    for subject, class_map in PAYAL_SUBJECTS.items()
+}
+
+
+def topics_json(module_name):
+    """Encoded topics of a syllabus module, or None if there is no such module."""
+    return _TOPICS_JSON.get(module_name)
+
+
+def payal_topics_json(class_label, subject):
+    """Encoded topics of a subject in a class ('Class 11', 'Physics'), or None."""
+    return _PAYAL_TOPICS_JSON.get((class_label, subject))
+
+
+def json_response(body):
+    return current_app.response_class(body, mimetype='application/json')
@@ -0,0 +1,86 @@
+"""
+Per-process cache of authenticated user identities for Flask-Login.
+
+load_user runs on every authenticated request (including each /api/review call
+in a study session). Instead of a primary-key query each time, a small LRU
+cache with a TTL keeps a lightweight snapshot of the fields the views use.
+Entries are dropped on logout and whenever a User row is updated or deleted in
+this process; other gunicorn workers pick up changes once the TTL expires.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from models import User
+
+
+class CachedUser(UserMixin):
+    """Read-only snapshot of a User, used as current_user."""
+
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+class UserCache:
+    """Thread-safe LRU cache of CachedUser objects with a time-to-live."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (expires_at, CachedUser)
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize, ttl):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user):
+        """Cache a snapshot of a User model instance and return it."""
+        cached = CachedUser(user.id, user.username, user.email)
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return cached
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, cached)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)